@@ -10,6 +10,9 @@ from column4_microsoft import render_column4_microsoft
 # Import columns cho Method 3 và Method 4
 from column1_method3 import render_column1_method3
 from column2_method4 import render_column2_method4
+from catalog import get_catalog
+from dataset_cache import DATASET_CACHE_WATCH, render_dataset_cache_info, start_source_watcher
+from map_panel import ANIMATION_MAX_YEARS, MAP_DETAILS, MAP_PRECISIONS, MAP_RENDERERS, YEAR_MODES
 
 # Import columns cho Prediction
 from column5 import render_column5
@@ -402,12 +405,48 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# Site shown when the dashboard opens
+DEFAULT_SITE = "CATALANGA"
+
+# Sites are listed from the dataset catalog (scanned once, see catalog.py)
+sites = get_catalog().sites()
+
 # Sidebar
 with st.sidebar:
     st.markdown('<h2 style="font-size: 1.3rem; margin-top: 0;">⚙️ Settings</h2>', unsafe_allow_html=True)
-
-# Fixed site for now
-SITE = "CATALANGA"
+    SITE = st.selectbox(
+        "Site",
+        sites,
+        index=sites.index(DEFAULT_SITE) if DEFAULT_SITE in sites else 0,
+        key="site"
+    )
+    st.radio(
+        "Map renderer",
+        MAP_RENDERERS,
+        key="map_renderer",
+        help="Leaflet maps are sent only the features in view, at the detail of the zoom, "
+             "and reload them as you pan; they show one year at a time."
+    )
+    st.radio(
+        "Map year selection",
+        YEAR_MODES,
+        key="map_year_mode",
+        help=f"Auto animates archives of up to {ANIMATION_MAX_YEARS} years in the browser "
+             "and switches to a server-side year slider for longer ones."
+    )
+    st.radio(
+        "Map detail",
+        MAP_DETAILS,
+        key="map_detail",
+        help="Auto draws shorelines and transects simplified to the map's pixel size."
+    )
+    st.radio(
+        "Map coordinate precision",
+        list(MAP_PRECISIONS),
+        key="map_precision",
+        help="Rounded coordinates drop duplicate vertices and are sent as binary arrays."
+    )
+    st.checkbox("Show map payload sizes", key="show_map_payload")
 
 # Row 1 - Four columns for maps (2 hàng x 2 cột)
 st.markdown('<h2>🗺️ Interactive Coastal Maps</h2>', unsafe_allow_html=True)
@@ -512,4 +551,12 @@ st.markdown("""
 <div style='text-align: center; color: #6c757d;'>
     <p>Coastal Shoreline Changes Dashboard | Powered by Streamlit & Plotly</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Optionally evict cached datasets as soon as their files change on disk
+if DATASET_CACHE_WATCH:
+    start_source_watcher("data")
+
+# Dataset cache readout, drawn last so it includes this run's loads
+with st.sidebar:
+    render_dataset_cache_info()
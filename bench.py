@@ -0,0 +1,11 @@
+import time
+
+
+def best_time(func, repeat):
+    """Return the fastest of repeat runs of func, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
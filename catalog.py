@@ -0,0 +1,334 @@
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+from data_sources import file_hash, source_files, source_signature, temporary_path
+
+# Folder the dashboard's datasets live in
+DATA_ROOT = "data"
+
+# Manifest of every dataset under DATA_ROOT, written by build_catalog()
+CATALOG_PATH = Path(".cache/catalog.json")
+
+# Bump when the entries change shape so older manifests are rebuilt
+CATALOG_VERSION = 1
+
+# Files catalogued as datasets (shapefile sidecars are part of their .shp)
+DATASET_SUFFIXES = ('.shp', '.csv')
+
+# Folder levels naming a method: data/<method>/<site>/, except the
+# prediction models, which sit one level deeper (data/Prediction/Pre1/<site>/)
+METHOD_DEPTH = {'Prediction': 2}
+
+# Sea level rise scenario folders (SLR_0_1m = 0.1 m)
+SCENARIO_PATTERN = re.compile(r'^SLR_(\d+)_(\d+)m$')
+
+# Fields the year of a feature or row is read from, in order of preference
+YEAR_FIELD_NAMES = ('year', 'end_year', 'endYear', 'Year', 'YEAR')
+
+# Seconds between checks that the shared catalog still matches the files
+# under its root. A check stats every dataset file, so it is only a backstop:
+# changes are picked up at once by the source watcher (DATASET_CACHE_WATCH=1)
+# or when the dataset cache is cleared from the sidebar
+CATALOG_CHECK_INTERVAL = float(os.environ.get("CATALOG_CHECK_INTERVAL", 3600))
+
+# When each root's shared catalog was last checked
+_last_checked = {}
+
+
+def parse_dataset_path(path, root=DATA_ROOT):
+    """Return (method, site, scenario, layer) of a dataset file under root.
+
+    layer is the file name without its suffix and without the site prefix
+    (CATALANGA_shorelines.shp -> shorelines); scenario is the SLR folder the
+    file is in, or None. Returns None for files outside a site folder.
+    """
+    parts = Path(path).relative_to(root).parts
+    depth = METHOD_DEPTH.get(parts[0], 1)
+    if len(parts) < depth + 2:
+        return None
+    method = "/".join(parts[:depth])
+    site = parts[depth]
+    scenario = next((part for part in parts[depth + 1:-1] if SCENARIO_PATTERN.match(part)), None)
+    layer = Path(parts[-1]).stem
+    if layer.startswith(f"{site}_"):
+        layer = layer[len(site) + 1:]
+    return method, site, scenario, layer
+
+
+def scenario_rise(scenario):
+    """Sea level rise of an SLR scenario folder, in metres (SLR_0_1m -> 0.1)"""
+    match = SCENARIO_PATTERN.match(scenario)
+    return float(f"{match.group(1)}.{match.group(2)}")
+
+
+def scenario_label(scenario):
+    """Display name of an SLR scenario folder (SLR_0_1m -> 0.1m Sea Level Rise)"""
+    match = SCENARIO_PATTERN.match(scenario)
+    return f"{match.group(1)}.{match.group(2)}m Sea Level Rise"
+
+
+def find_datasets(root=DATA_ROOT):
+    """Dataset files under root, in a stable order"""
+    return sorted(
+        path for path in Path(root).rglob("*")
+        if path.suffix.lower() in DATASET_SUFFIXES and path.is_file()
+    )
+
+
+def content_files(path):
+    """Files whose bytes make up a dataset (derived GeoParquet copies excluded)"""
+    return [file for file in source_files(path) if file.suffix != '.parquet']
+
+
+def describe_dataset(path):
+    """Read a dataset once and summarize it as a catalog entry (without its location)"""
+    path = Path(path)
+    files = {str(file): file_hash(file) for file in content_files(path)}
+    entry = {
+        'kind': 'shapefile' if path.suffix.lower() == '.shp' else 'csv',
+        'files': files,
+        'hash': hashlib.sha256(json.dumps(sorted(files.values())).encode()).hexdigest(),
+        'signature': source_signature(path, 'mtime'),
+        'crs': None,
+        'bounds': None
+    }
+
+    if entry['kind'] == 'shapefile':
+        import pyogrio
+        from geoparquet import read_layer
+        from reproject import GEOGRAPHIC_CRS, transformer
+
+        data = read_layer(path, crs=None)
+        entry['crs'] = pyogrio.read_info(path)['crs']
+        if len(data):
+            bounds = transformer(data.crs, GEOGRAPHIC_CRS).transform_bounds(*data.total_bounds)
+            entry['bounds'] = [round(value, 6) for value in bounds]
+        fields = [col for col in data.columns if col != data.geometry.name]
+    else:
+        import pandas as pd
+
+        data = pd.read_csv(path)
+        fields = list(data.columns)
+
+    entry['fields'] = fields
+    entry['features'] = len(data)
+    entry['year_field'] = next((field for field in YEAR_FIELD_NAMES if field in fields), None)
+    entry['years'] = None
+    if entry['year_field'] is not None:
+        import pandas as pd
+
+        years = pd.to_numeric(data[entry['year_field']], errors='coerce').dropna()
+        if len(years):
+            entry['years'] = [int(years.min()), int(years.max())]
+    return entry
+
+
+def _same_signature(entry, path):
+    try:
+        return [list(item) for item in source_signature(path, 'mtime')] == [list(item) for item in entry['signature']]
+    except OSError:
+        return False
+
+
+def build_catalog(root=DATA_ROOT, previous=None):
+    """Scan root and return the catalog manifest.
+
+    Entries of previous (an earlier manifest of the same root) whose files
+    are unchanged are reused, so only new or modified datasets are read.
+    """
+    reuse = {}
+    if previous and previous.get('version') == CATALOG_VERSION and previous.get('root') == str(root):
+        reuse = {entry['path']: entry for entry in previous['datasets']}
+
+    datasets = []
+    for path in find_datasets(root):
+        parsed = parse_dataset_path(path, root)
+        if parsed is None:
+            continue
+        entry = reuse.get(str(path))
+        if entry is None or not _same_signature(entry, path):
+            entry = describe_dataset(path)
+        elif entry.get('stored') and not os.path.exists(entry['stored']):
+            # Its store copy was deleted: load from the data folder again
+            entry = {key: value for key, value in entry.items() if key != 'stored'}
+        method, site, scenario, layer = parsed
+        datasets.append(dict(
+            entry, path=str(path), method=method, site=site, scenario=scenario, layer=layer
+        ))
+    return {
+        'version': CATALOG_VERSION,
+        'root': str(root),
+        'built': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'datasets': datasets
+    }
+
+
+def read_manifest(path=CATALOG_PATH):
+    """Return the stored manifest, or None if there is none"""
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(manifest, path=CATALOG_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temporary_path(path)
+    tmp.write_text(json.dumps(manifest, indent=1), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def is_current(manifest, root=DATA_ROOT):
+    """True if manifest lists exactly the datasets under root, all unchanged"""
+    if not manifest or manifest.get('version') != CATALOG_VERSION or manifest.get('root') != str(root):
+        return False
+    listed = {entry['path']: entry for entry in manifest['datasets']}
+    found = [
+        str(path) for path in find_datasets(root)
+        if parse_dataset_path(path, root) is not None
+    ]
+    return (
+        sorted(found) == sorted(listed)
+        and all(_same_signature(entry, path) for path, entry in listed.items())
+        and all(os.path.exists(entry['stored']) for entry in listed.values() if entry.get('stored'))
+    )
+
+
+def load_catalog(root=DATA_ROOT, path=CATALOG_PATH):
+    """Return the Catalog of root, rebuilding the stored manifest if it is out of date"""
+    manifest = read_manifest(path)
+    if not is_current(manifest, root):
+        manifest = build_catalog(root, previous=manifest)
+        write_manifest(manifest, path)
+    return Catalog(manifest)
+
+
+class Catalog:
+    """Lookup of the datasets recorded in a catalog manifest.
+
+    Lookups never touch the filesystem: a dataset missing from the
+    manifest is reported as None.
+    """
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.root = manifest['root']
+        self.datasets = manifest['datasets']
+        self._by_key = {
+            (entry['method'], entry['site'], entry['scenario'], entry['layer']): entry
+            for entry in self.datasets
+        }
+        self._by_path = {entry['path']: entry for entry in self.datasets}
+        self._by_hash = {}
+        for entry in self.datasets:
+            self._by_hash.setdefault(entry['hash'], []).append(entry)
+
+    def __len__(self):
+        return len(self.datasets)
+
+    def entry(self, method, site, layer, scenario=None):
+        """Catalog entry of a dataset, or None if it does not exist"""
+        return self._by_key.get((method, site, scenario, layer))
+
+    def find(self, method, site, layer, scenario=None):
+        """Path of a dataset, or None if it does not exist"""
+        entry = self.entry(method, site, layer, scenario)
+        return Path(entry['path']) if entry is not None else None
+
+    def entry_for(self, path):
+        """Catalog entry of a dataset file, or None"""
+        return self._by_path.get(str(path))
+
+    def sites(self):
+        return sorted({entry['site'] for entry in self.datasets})
+
+    def methods(self, site=None):
+        return sorted({entry['method'] for entry in self.datasets if site in (None, entry['site'])})
+
+    def scenarios(self, method, site):
+        """SLR scenario folders of a method's site, lowest sea level rise first"""
+        return sorted(
+            {entry['scenario'] for entry in self.datasets
+             if entry['method'] == method and entry['site'] == site and entry['scenario']},
+            key=scenario_rise
+        )
+
+    def copies(self, path):
+        """Entries of every dataset with the same content as the one at path"""
+        return self._by_hash[self.entry_for(path)['hash']]
+
+    def source(self, path):
+        """File to load the dataset at path from.
+
+        Datasets with the same content resolve to the same file: their copy
+        in the content-addressed store (see datastore.py) once ingested,
+        else the first of their paths. Loaders keyed on this file parse
+        and cache each distinct dataset once.
+        """
+        entry = self.entry_for(path)
+        return Path(entry.get('stored') or self.copies(path)[0]['path'])
+
+    def add_derived(self, entry):
+        """Record a file computed from catalogued datasets (e.g. intersections)
+        for the lookups by path. It is kept in memory only, out of the
+        manifest and of the site, method and scenario listings."""
+        self._by_path[entry['path']] = entry
+        self._by_hash[entry['hash']] = [entry]
+        return entry
+
+    def file_hashes(self, paths):
+        """{file: content hash} of every file of the datasets at paths"""
+        hashes = {}
+        for path in paths:
+            hashes.update(self.entry_for(path)['files'])
+        return hashes
+
+
+def get_catalog(root=DATA_ROOT):
+    """The catalog of root, loaded once and shared through the dataset cache.
+
+    It is reloaded (with the manifest refreshed) when the source watcher
+    sees a file under root change or the dataset cache is cleared. As a
+    backstop it is also checked against the files under root every
+    CATALOG_CHECK_INTERVAL seconds (an hour by default), and reloaded when a
+    dataset was added, removed, edited or lost its store copy.
+    """
+    from dataset_cache import DATASETS
+
+    key = ('get_catalog', str(root))
+    catalog = DATASETS.get(key, lambda: load_catalog(root), sources=[root])
+    now = time.monotonic()
+    if now - _last_checked.get(key, float('-inf')) >= CATALOG_CHECK_INTERVAL:
+        _last_checked[key] = now
+        if not is_current(catalog.manifest, root):
+            DATASETS.evict(lambda cached: cached == key)
+            catalog = DATASETS.get(key, lambda: load_catalog(root), sources=[root])
+    return catalog
+
+
+if __name__ == "__main__":
+    # Build or refresh the dataset catalog from the project root:
+    #   python catalog.py [data] [--rebuild]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Catalog the datasets under the data folder")
+    parser.add_argument("root", nargs="?", default=DATA_ROOT)
+    parser.add_argument("--rebuild", action="store_true", help="read every dataset again")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    previous = None if args.rebuild else read_manifest()
+    manifest = build_catalog(args.root, previous)
+    write_manifest(manifest)
+    for entry in manifest['datasets']:
+        years = "-".join(map(str, entry['years'])) if entry['years'] else ""
+        print(f"{entry['method']:<16} {entry['site']:<10} {entry['scenario'] or '':<9} "
+              f"{entry['layer']:<36} {entry['features']:6d} {entry['year_field'] or '':<9} {years:<9} "
+              f"{entry['crs'] or ''}")
+    print(f"{len(manifest['datasets'])} datasets catalogued in {CATALOG_PATH} "
+          f"({time.perf_counter() - start:.1f} s)")
@@ -1,7 +1,9 @@
 import streamlit as st
 import plotly.graph_objects as go
-import pandas as pd
 from pathlib import Path
+from catalog import get_catalog
+from timeseries import load_transect_series
+from transect_statistics import site_statistics
 
 def render_column3(method, site):
     """Render time series plots for Column 3"""
@@ -10,32 +12,29 @@ def render_column3(method, site):
     
     # Load CSV data
     csv_path = Path(f"data/{method}/{site}/Column1Graph")
+    catalog = get_catalog()
     
     # Check for required files
-    transect_stats_path = csv_path / "transect_statistics.csv"
-    time_series_path = csv_path / "time_series_data.csv"
+    time_series_path = catalog.find(method, site, 'time_series_data')
     
-    if not transect_stats_path.exists() or not time_series_path.exists():
+    if time_series_path is None:
         st.warning(f"""
         ⚠️ **Data files not found!**
         
         Please ensure the following files exist:
-        - {transect_stats_path}
-        - {time_series_path}
+        - {csv_path / 'transect_statistics.csv'} (optional, derived from the time series if missing)
+        - {csv_path / 'time_series_data.csv'}
         """)
         return
     
     try:
         # Load data
-        transect_stats = pd.read_csv(transect_stats_path)
-        time_series = pd.read_csv(time_series_path)
-        
-        # Convert dates column to datetime
-        time_series['dates'] = pd.to_datetime(time_series['dates'])
+        transect_stats = site_statistics(catalog, method, site)
+        series = load_transect_series(str(catalog.source(time_series_path)))
         
         # Get list of transects
-        transects = [col for col in time_series.columns if col.endswith('_distance_m')]
-        transect_names = [col.replace('_distance_m', '') for col in transects]
+        transect_names = series.transects
+        transects = [f"{name}_distance_m" for name in transect_names]
         
         # Create figure with subplots for each transect
         fig = go.Figure()
@@ -45,8 +44,8 @@ def render_column3(method, site):
             # Get transect statistics
             stats = transect_stats[transect_stats['Transect'] == transect_name].iloc[0]
             
-            # Filter data for this transect (remove NaN values)
-            transect_data = time_series[['dates', 'year', transect_col]].dropna()
+            # Observations of this transect with a date and year (one slice of the long-format series)
+            transect_data = series.frame(transect_name)
             
             # Calculate cumulative change from first observation
             if len(transect_data) > 0:
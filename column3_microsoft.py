@@ -1,7 +1,9 @@
 import streamlit as st
 import plotly.graph_objects as go
-import pandas as pd
 from pathlib import Path
+from catalog import get_catalog
+from timeseries import load_transect_series
+from transect_statistics import site_statistics
 
 def render_column3_microsoft(method, site):
     """Render time series plots for Column 3 - Microsoft Method"""
@@ -10,18 +12,18 @@ def render_column3_microsoft(method, site):
     
     # Load CSV data từ folder Microsoft
     csv_path = Path(f"data/Microsoft/{site}/Column1Graph")
+    catalog = get_catalog()
     
     # Check for required files
-    transect_stats_path = csv_path / "transect_statistics.csv"
-    time_series_path = csv_path / "time_series_data.csv"
+    time_series_path = catalog.find('Microsoft', site, 'time_series_data')
     
-    if not transect_stats_path.exists() or not time_series_path.exists():
+    if time_series_path is None:
         st.warning(f"""
         ⚠️ **Data files not found!**
         
         Please ensure the following files exist:
-        - {transect_stats_path}
-        - {time_series_path}
+        - {csv_path / 'transect_statistics.csv'} (optional, derived from the time series if missing)
+        - {csv_path / 'time_series_data.csv'}
         
         Expected folder structure:
         ```
@@ -37,15 +39,12 @@ def render_column3_microsoft(method, site):
     
     try:
         # Load data
-        transect_stats = pd.read_csv(transect_stats_path)
-        time_series = pd.read_csv(time_series_path)
-        
-        # Convert dates column to datetime
-        time_series['dates'] = pd.to_datetime(time_series['dates'])
+        transect_stats = site_statistics(catalog, 'Microsoft', site)
+        series = load_transect_series(str(catalog.source(time_series_path)))
         
         # Get list of transects
-        transects = [col for col in time_series.columns if col.endswith('_distance_m')]
-        transect_names = [col.replace('_distance_m', '') for col in transects]
+        transect_names = series.transects
+        transects = [f"{name}_distance_m" for name in transect_names]
         
         # Create figure
         fig = go.Figure()
@@ -53,7 +52,7 @@ def render_column3_microsoft(method, site):
         # Add traces for each transect
         for i, (transect_col, transect_name) in enumerate(zip(transects, transect_names)):
             stats = transect_stats[transect_stats['Transect'] == transect_name].iloc[0]
-            transect_data = time_series[['dates', 'year', transect_col]].dropna()
+            transect_data = series.frame(transect_name)
             
             if len(transect_data) > 0:
                 first_value = transect_data[transect_col].iloc[0]
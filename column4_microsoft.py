@@ -1,8 +1,9 @@
 import streamlit as st
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import pandas as pd
 from pathlib import Path
+from catalog import get_catalog
+from transect_statistics import site_statistics
 
 def render_column4_microsoft(method, site):
     """Render summary statistics plots for Column 4 - Microsoft Method"""
@@ -10,19 +11,22 @@ def render_column4_microsoft(method, site):
     st.markdown('<h3>📊 Summary Statistics - Microsoft</h3>', unsafe_allow_html=True)
     
     csv_path = Path(f"data/Microsoft/{site}/Column1Graph")
-    transect_stats_path = csv_path / "transect_statistics.csv"
+    catalog = get_catalog()
+    transect_stats_path = catalog.find('Microsoft', site, 'transect_statistics')
+    time_series_path = catalog.find('Microsoft', site, 'time_series_data')
     
-    if not transect_stats_path.exists():
+    if transect_stats_path is None and time_series_path is None:
         st.warning(f"""
         ⚠️ **Data file not found!**
         
-        Please ensure the following file exists:
-        - {transect_stats_path}
+        Please ensure one of the following files exists:
+        - {csv_path / 'transect_statistics.csv'}, or
+        - {csv_path / 'time_series_data.csv'} to derive the statistics from
         """)
         return
     
     try:
-        transect_stats = pd.read_csv(transect_stats_path)
+        transect_stats = site_statistics(catalog, 'Microsoft', site)
         
         # Create figure với màu sắc khác để phân biệt
         fig = make_subplots(
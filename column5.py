@@ -2,25 +2,34 @@ import streamlit as st
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.colors
-import geopandas as gpd
 import pandas as pd
-from pathlib import Path
 import numpy as np
+from catalog import get_catalog, scenario_label
+from dataset_cache import cached_dataset
+from geoparquet import read_layer
+from reproject import projected_crs, to_crs_batch
+
+
+@cached_dataset
+def load_shapefiles(historical_path, prediction_path):
+    """Load the historical and predicted shorelines of one SLR scenario"""
+    historical = read_layer(historical_path, crs=None, columns=("year",))
+    prediction = read_layer(prediction_path, crs=None, columns=("year",))
+
+    # Lengths and positions are measured in metres, in a projected CRS
+    return tuple(to_crs_batch([historical, prediction], projected_crs(historical)))
 
 def render_column5(method, site):
     """Render prediction visualization for Column 5 - Pre1"""
     
     st.markdown('<h3>📈 Bruun Rules Prediction (2025-2100)</h3>', unsafe_allow_html=True)
     
-    base_path = Path(f"data/Prediction/{method}/{site}")
+    catalog = get_catalog()
     
-    # Define SLR scenarios
+    # SLR scenarios found in the dataset catalog
     slr_scenarios = {
-        "0.1m Sea Level Rise": "SLR_0_1m",
-        "0.2m Sea Level Rise": "SLR_0_2m",
-        "0.3m Sea Level Rise": "SLR_0_3m",
-        "0.5m Sea Level Rise": "SLR_0_5m",
-        "1.0m Sea Level Rise": "SLR_1_0m"
+        scenario_label(scenario): scenario
+        for scenario in catalog.scenarios(f"Prediction/{method}", site)
     }
     
     # Dropdown to select SLR scenario
@@ -30,39 +39,24 @@ def render_column5(method, site):
         key="prediction_slr_scenario_selector"
     )
     
-    slr_folder = slr_scenarios[selected_slr]
+    slr_folder = slr_scenarios.get(selected_slr)
     
     # Paths
-    historical_path = base_path / slr_folder / "shorelines_2019_2024.shp"
-    prediction_path = base_path / slr_folder / "shorelines_2025_2100.shp"
+    historical_path = catalog.find(f"Prediction/{method}", site, "shorelines_2019_2024", slr_folder)
+    prediction_path = catalog.find(f"Prediction/{method}", site, "shorelines_2025_2100", slr_folder)
     
-    files_exist = historical_path.exists() and prediction_path.exists()
+    files_exist = historical_path is not None and prediction_path is not None
     
     if files_exist:
         try:
             # Load shapefiles
-            @st.cache_data
-            def load_shapefiles(historical_path, prediction_path):
-                historical = gpd.read_file(historical_path)
-                prediction = gpd.read_file(prediction_path)
-                
-                # Remove None geometries
-                historical = historical[historical.geometry.notna()]
-                prediction = prediction[prediction.geometry.notna()]
-                
-                return historical, prediction
-            
-            historical, prediction = load_shapefiles(str(historical_path), str(prediction_path))
-            
-            # Auto-detect year field
-            def find_year_field(gdf, possible_names):
-                for name in possible_names:
-                    if name in gdf.columns:
-                        return name
-                return None
+            historical, prediction = load_shapefiles(
+                str(catalog.source(historical_path)), str(catalog.source(prediction_path))
+            )
             
-            year_field_hist = find_year_field(historical, ['year', 'Year', 'YEAR'])
-            year_field_pred = find_year_field(prediction, ['year', 'Year', 'YEAR'])
+            # Year fields recorded in the catalog
+            year_field_hist = catalog.entry_for(historical_path)['year_field']
+            year_field_pred = catalog.entry_for(prediction_path)['year_field']
             
             if not year_field_hist or not year_field_pred:
                 st.error("❌ Cannot find year field in shapefiles!")
@@ -83,12 +77,11 @@ def render_column5(method, site):
                     # Calculate mean position (centroid)
                     if not year_data.empty:
                         centroids = year_data.geometry.centroid
-                        mean_lat = centroids.y.mean()
-                        mean_lon = centroids.x.mean()
+                        mean_northing = centroids.y.mean()
                         
                         years.append(year)
                         lengths.append(total_length)
-                        positions.append(mean_lat)  # Using latitude as proxy for position
+                        positions.append(mean_northing)  # Using northing (m) as proxy for position
                 
                 return pd.DataFrame({
                     'year': years,
@@ -102,8 +95,8 @@ def render_column5(method, site):
             # Calculate change relative to baseline (2019 or first year)
             if len(hist_metrics) > 0:
                 baseline_position = hist_metrics['position'].iloc[0]
-                hist_metrics['change_m'] = (hist_metrics['position'] - baseline_position) * 111000  # Convert degrees to meters
-                pred_metrics['change_m'] = (pred_metrics['position'] - baseline_position) * 111000
+                hist_metrics['change_m'] = hist_metrics['position'] - baseline_position
+                pred_metrics['change_m'] = pred_metrics['position'] - baseline_position
             
             # Create subplots
             fig = make_subplots(
@@ -392,6 +385,6 @@ def render_column5(method, site):
         ```
         
         Missing files:
-        - Historical: {'✓' if historical_path.exists() else '❌'}
-        - Prediction: {'✓' if prediction_path.exists() else '❌'}
+        - Historical: {'✓' if historical_path is not None else '❌'}
+        - Prediction: {'✓' if prediction_path is not None else '❌'}
         """)
@@ -1,8 +1,9 @@
 import streamlit as st
 import plotly.graph_objects as go
-import pandas as pd
 from pathlib import Path
 import numpy as np
+from catalog import get_catalog
+from timeseries import load_statistics, load_transect_series
 
 def render_column6(method, site):
     """Render prediction visualization for Column 6 - Pre2"""
@@ -11,15 +12,16 @@ def render_column6(method, site):
     
     # Load prediction data
     csv_path = Path(f"data/Prediction/{method}/{site}")
-    prediction_path = csv_path / "transect_timeseries_predicted.csv"
-    stats_path = csv_path / "coastal_change_statistics_predicted.csv"
+    catalog = get_catalog()
+    prediction_path = catalog.find(f"Prediction/{method}", site, 'transect_timeseries_predicted')
+    stats_path = catalog.find(f"Prediction/{method}", site, 'coastal_change_statistics_predicted')
     
-    if not prediction_path.exists():
+    if prediction_path is None:
         st.warning(f"""
         ⚠️ **Prediction data not found!**
         
         Please ensure the following file exists:
-        - {prediction_path}
+        - {csv_path / 'transect_timeseries_predicted.csv'}
         
         Expected CSV structure:
         - dates: Date column
@@ -30,15 +32,11 @@ def render_column6(method, site):
     
     try:
         # Load data
-        prediction_data = pd.read_csv(prediction_path)
-        
-        # Convert dates to datetime if needed
-        if 'dates' in prediction_data.columns:
-            prediction_data['dates'] = pd.to_datetime(prediction_data['dates'])
+        series = load_transect_series(str(catalog.source(prediction_path)))
         
         # Get list of transects
-        transects = [col for col in prediction_data.columns if col.endswith('_distance_m')]
-        transect_names = [col.replace('_distance_m', '') for col in transects]
+        transect_names = series.transects
+        transects = [f"{name}_distance_m" for name in transect_names]
         
         # Selectbox to choose transect
         selected_transect_col = st.selectbox(
@@ -50,13 +48,13 @@ def render_column6(method, site):
         
         selected_transect_name = selected_transect_col.replace('_distance_m', '')
         
-        # Filter data for selected transect (remove NaN values)
-        transect_data = prediction_data[['year', selected_transect_col]].dropna()
+        # Observations of the selected transect with a year (one slice of the long-format series)
+        transect_data = series.frame(selected_transect_name, required=['year'])
         
         # Load statistics if available
         stats_available = False
-        if stats_path.exists():
-            stats_data = pd.read_csv(stats_path)
+        if stats_path is not None:
+            stats_data = load_statistics(str(catalog.source(stats_path)))
             stats_row = stats_data[stats_data['Transect'] == selected_transect_name]
             if not stats_row.empty:
                 stats_available = True
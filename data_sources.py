@@ -0,0 +1,58 @@
+import functools
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+# Files that make up one shapefile dataset (plus its GeoParquet copy)
+SHAPEFILE_SIDECARS = ('.shp', '.shx', '.dbf', '.prj', '.cpg', '.parquet')
+
+# How a source version is identified: 'mtime' (size and modification time
+# of every file) or 'content' (SHA-256 of every file's bytes)
+SOURCE_KEY_MODE = os.environ.get("DATASET_CACHE_KEY", "mtime")
+
+
+def temporary_path(path, suffix='.tmp'):
+    """Name next to path to write it under before os.replace, unique to this
+    process and thread (Streamlit runs its sessions as threads of one process)"""
+    path = Path(path)
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}{suffix}")
+
+
+def source_files(path):
+    """Return the files a dataset is read from: every sidecar of a shapefile"""
+    path = Path(path)
+    if path.suffix.lower() != '.shp':
+        return [path]
+    return [
+        sidecar for sidecar in (path.with_suffix(suffix) for suffix in SHAPEFILE_SIDECARS)
+        if sidecar.exists()
+    ]
+
+
+@functools.lru_cache(maxsize=1024)
+def _content_hash(path, size, mtime_ns):
+    """Hash a file's bytes (size and mtime only key the in-process memo)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    """SHA-256 of a file, recomputed only when its size or mtime changes"""
+    stat = os.stat(path)
+    return _content_hash(str(path), stat.st_size, stat.st_mtime_ns)
+
+
+def source_signature(path, mode=None):
+    """Version of a dataset: size/mtime or content hash of each of its files"""
+    signature = []
+    for file in source_files(path):
+        if (mode or SOURCE_KEY_MODE) == 'content':
+            signature.append((file.name, file_hash(file)))
+        else:
+            stat = os.stat(file)
+            signature.append((file.name, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
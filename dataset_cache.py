@@ -0,0 +1,209 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_sources import source_files, source_signature
+
+# Most datasets kept in memory at once (least recently used are evicted first).
+# One dashboard run uses about 25 (the Leaflet maps: one per layer and year
+# shown, plus the partition indexes); this leaves room for a few sites and years
+DATASET_CACHE_MAX_ENTRIES = int(os.environ.get("DATASET_CACHE_MAX_ENTRIES", 128))
+
+# Seconds a dataset stays cached after loading (unset = no expiry)
+DATASET_CACHE_TTL = float(os.environ["DATASET_CACHE_TTL"]) if os.environ.get("DATASET_CACHE_TTL") else None
+
+# Watch the data folder and evict datasets as soon as their files change
+DATASET_CACHE_WATCH = os.environ.get("DATASET_CACHE_WATCH", "") not in ("", "0")
+
+
+def dataset_nbytes(value):
+    """Estimate the memory held by a cached dataset"""
+    if isinstance(value, pd.DataFrame):
+        size = int(value.memory_usage(deep=True).sum())
+        geometry = getattr(value, '_geometry_column_name', None)
+        if geometry in value.columns:
+            import shapely
+
+            # Coordinates plus a rough per-geometry overhead
+            geoms = np.asarray(value[geometry].values, dtype=object)
+            size += int(shapely.get_num_coordinates(geoms).sum()) * 16 + len(geoms) * 100
+        return size
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(dataset_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(dataset_nbytes(item) for item in value)
+    return int(getattr(value, 'nbytes', 0))
+
+
+class DatasetCache:
+    """Process-wide LRU cache of loaded datasets shared by every panel.
+
+    Entries are evicted least recently used first once there are more than
+    max_entries, and dropped ttl seconds after loading or as soon as the
+    signature of their source files changes. Cached values are shared
+    between sessions, so callers must not modify them in place.
+    """
+
+    def __init__(self, max_entries=DATASET_CACHE_MAX_ENTRIES, ttl=DATASET_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.watching = None
+
+    def get(self, key, load, signature=None, sources=()):
+        """Return the dataset under key, calling load() on a miss.
+
+        signature identifies the version of the source files (see
+        data_sources.source_signature); an entry loaded from another version
+        is reloaded. sources are the files the dataset is read from.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry['signature'] != signature
+                or self.ttl is not None and now - entry['loaded'] > self.ttl
+            ):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry['hits'] += 1
+                return entry['value']
+
+        # Load outside the lock so other panels are not blocked
+        value = load()
+        with self._lock:
+            self._entries[key] = {
+                'value': value,
+                'loaded': time.time(),
+                'hits': 0,
+                'nbytes': dataset_nbytes(value),
+                'signature': signature,
+                'sources': frozenset(os.path.realpath(path) for path in sources)
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def evict(self, predicate=None):
+        """Drop the entries whose key matches predicate (all if None)"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate is None or predicate(key)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def evict_sources(self, paths):
+        """Drop the entries read from any of paths (or a folder above them); returns how many"""
+        changed = [Path(os.path.realpath(path)) for path in paths]
+        paths = {str(folder) for path in changed for folder in (path, *path.parents)}
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry['sources'] & paths]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def entries(self):
+        """Return (key, nbytes, age in seconds, hits) of every entry, most recent first"""
+        now = time.time()
+        with self._lock:
+            return [
+                (key, entry['nbytes'], now - entry['loaded'], entry['hits'])
+                for key, entry in reversed(self._entries.items())
+            ]
+
+
+DATASETS = DatasetCache()
+
+
+def cached_dataset(func):
+    """Cache func's results in DATASETS, keyed by its name and arguments.
+
+    Arguments naming existing files are the dataset's sources: the entry is
+    reloaded when any of their files (including shapefile sidecars) changes.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__qualname__,) + args + tuple(sorted(kwargs.items()))
+        paths = [
+            arg for arg in list(args) + list(kwargs.values())
+            if isinstance(arg, (str, Path)) and os.path.isfile(arg)
+        ]
+        return DATASETS.get(
+            key,
+            lambda: func(*args, **kwargs),
+            signature=tuple(source_signature(path) for path in paths),
+            sources=[file for path in paths for file in source_files(path)]
+        )
+    return wrapper
+
+
+def start_source_watcher(root="data"):
+    """Evict cached datasets whose files change under root.
+
+    Needs the optional watchdog package; returns False if it is missing.
+    The watcher runs once per process, on a daemon thread.
+    """
+    if DATASETS.watching is not None:
+        return True
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return False
+
+    class EvictChangedSources(FileSystemEventHandler):
+        def on_any_event(self, event):
+            if not event.is_directory:
+                # Moves also evict the datasets read from the destination
+                DATASETS.evict_sources([event.src_path, getattr(event, 'dest_path', '') or event.src_path])
+
+    observer = Observer()
+    observer.schedule(EvictChangedSources(), str(root), recursive=True)
+    observer.daemon = True
+    observer.start()
+    DATASETS.watching = str(root)
+    return True
+
+
+def render_dataset_cache_info():
+    """Sidebar readout of the datasets resident in memory"""
+    entries = DATASETS.entries()
+    total = sum(nbytes for _, nbytes, _, _ in entries)
+    ttl = f"{DATASETS.ttl:,.0f} s TTL" if DATASETS.ttl is not None else "no TTL"
+    watcher = f"watching {DATASETS.watching}/" if DATASETS.watching else "file watcher off"
+
+    with st.expander("🗄️ Dataset cache"):
+        st.caption(
+            f"{len(entries)} of {DATASETS.max_entries} datasets resident · "
+            f"{total / 1024 ** 2:,.1f} MB · {ttl} · {watcher}"
+        )
+        if entries:
+            st.dataframe(
+                pd.DataFrame({
+                    'Dataset': [key[0] for key, _, _, _ in entries],
+                    'Arguments': [", ".join(map(str, key[1:])) for key, _, _, _ in entries],
+                    'MB': [round(nbytes / 1024 ** 2, 2) for _, nbytes, _, _ in entries],
+                    'Age (s)': [round(age) for _, _, age, _ in entries],
+                    'Hits': [hits for _, _, _, hits in entries]
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+        if st.button("Clear dataset cache", key="clear_dataset_cache"):
+            DATASETS.evict()
+            st.rerun()
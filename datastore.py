@@ -0,0 +1,101 @@
+import os
+import shutil
+from pathlib import Path
+
+from catalog import CATALOG_PATH, DATA_ROOT, load_catalog, write_manifest
+from data_sources import temporary_path
+
+# Each distinct dataset is stored here once, named after its content hash
+STORE_DIR = Path(".cache/store")
+
+
+def stored_path(entry):
+    """Store file of a catalog entry: GeoParquet for shapefiles, the CSV itself otherwise"""
+    suffix = '.parquet' if entry['kind'] == 'shapefile' else '.csv'
+    return STORE_DIR / f"{entry['hash']}{suffix}"
+
+
+def store_dataset(entry):
+    """Write the store copy of a catalog entry unless it is already there; returns its path"""
+    from geoparquet import convert
+
+    target = stored_path(entry)
+    if target.exists():
+        return target
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    if entry['kind'] == 'shapefile':
+        return convert(entry['path'], target)
+    tmp = temporary_path(target)
+    shutil.copyfile(entry['path'], tmp)
+    os.replace(tmp, target)
+    return target
+
+
+def format_twins(root=DATA_ROOT):
+    """GeoJSON files that repeat a shapefile next to them (same folder and name)"""
+    return sorted(
+        path for path in Path(root).rglob("*.geojson")
+        if path.with_suffix('.shp').exists()
+    )
+
+
+def ingest(root=DATA_ROOT, catalog_path=CATALOG_PATH):
+    """Store every distinct dataset under root once and record it in the catalog.
+
+    Datasets with identical content (e.g. data/CoastSat and data/Coastsat)
+    share one store file; each catalog entry's 'stored' field points at it.
+    Returns the updated Catalog.
+    """
+    catalog = load_catalog(root, catalog_path)
+    for entry in catalog.datasets:
+        entry['stored'] = str(store_dataset(entry))
+    write_manifest(catalog.manifest, catalog_path)
+    return load_catalog(root, catalog_path)
+
+
+def prune(catalog):
+    """Delete store files no catalog entry refers to; returns how many"""
+    referenced = {entry.get('stored') for entry in catalog.datasets}
+    removed = 0
+    for path in STORE_DIR.glob("*"):
+        if str(path) not in referenced:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    # Manage the content-addressed store from the project root:
+    #   python datastore.py ingest [data]
+    #   python datastore.py list [data]
+    #   python datastore.py prune [data]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Store each distinct dataset once under its content hash")
+    parser.add_argument("command", choices=["ingest", "list", "prune"])
+    parser.add_argument("root", nargs="?", default=DATA_ROOT)
+    args = parser.parse_args()
+
+    catalog = ingest(args.root) if args.command == "ingest" else load_catalog(args.root)
+
+    if args.command == "prune":
+        print(f"Removed {prune(catalog)} unreferenced file(s) from {STORE_DIR}")
+    else:
+        groups = {}
+        for entry in catalog.datasets:
+            groups.setdefault(entry['hash'], []).append(entry)
+        for digest, entries in groups.items():
+            stored = entries[0].get('stored')
+            size = os.path.getsize(stored) if stored and os.path.exists(stored) else 0
+            print(f"{digest[:16]}  {size / 1024:8,.0f} KB  {stored or '(not stored)'}")
+            for entry in entries:
+                print(f"    {entry['path']}")
+        total = sum(os.path.getsize(file) for entry in catalog.datasets for file in entry['files'])
+        print(f"{len(catalog.datasets)} datasets, {len(groups)} distinct; "
+              f"{total / 1024 ** 2:,.1f} MB of source files")
+        twins = format_twins(args.root)
+        if twins:
+            size = sum(path.stat().st_size for path in twins)
+            print(f"{len(twins)} GeoJSON twins of shapefiles ({size / 1024 ** 2:,.1f} MB) are not stored:")
+            for path in twins:
+                print(f"    {path}")
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from data_sources import file_hash, source_files, temporary_path
+
+# Built map figures are stored here, one JSON file per figure
+CACHE_DIR = Path(".cache/figures")
+
+# Bump when the figure builders change so older entries are never served
+FIGURE_CACHE_VERSION = 2
+
+
+def source_hashes(paths):
+    """Return {file: content hash} of every file (and sidecar) of a figure's sources"""
+    return {str(file): file_hash(file) for path in paths for file in source_files(path)}
+
+
+def figure_key(paths, params, hashes=None):
+    """Cache key of a figure: hash of its source files and rendering parameters.
+
+    hashes are the {file: content hash} of the sources when already known
+    (e.g. from the dataset catalog); otherwise the files are hashed.
+    """
+    if hashes is None:
+        hashes = source_hashes(paths)
+    payload = json.dumps(
+        {'version': FIGURE_CACHE_VERSION, 'sources': hashes, 'params': params},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _figure_path(key, year=None):
+    return CACHE_DIR / (f"{key}.json" if year is None else f"{key}-{year}.json")
+
+
+def _report_path(key, year=None):
+    return _figure_path(key, year).with_suffix('.report.json')
+
+
+def _write_atomic(path, text):
+    """Write text through a temporary file so readers never see partial JSON"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temporary_path(path)
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def read_meta(key):
+    """Return the metadata of a cached figure, or None if it is not cached"""
+    try:
+        return json.loads((CACHE_DIR / f"{key}.meta.json").read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def read_figure(key, year=None):
+    """Return the cached figure JSON of key (and year, for one-year figures)"""
+    try:
+        return _figure_path(key, year).read_text(encoding='utf-8')
+    except OSError:
+        return None
+
+
+def read_report(key, year=None):
+    """Return the payload report lines stored with a cached figure, or None"""
+    try:
+        return json.loads(_report_path(key, year).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def write_figure(key, figure_json, meta, year=None, report=None):
+    """Store a built figure and its metadata (and payload report lines) under key"""
+    _write_atomic(_figure_path(key, year), figure_json)
+    if report is not None:
+        _write_atomic(_report_path(key, year), json.dumps(report))
+    meta = dict(meta, created=time.strftime('%Y-%m-%d %H:%M:%S'))
+    _write_atomic(CACHE_DIR / f"{key}.meta.json", json.dumps(meta, default=str))
+
+
+def cache_entries():
+    """Yield (key, meta, files) for every figure in the cache"""
+    for meta_path in sorted(CACHE_DIR.glob("*.meta.json")):
+        key = meta_path.name[:-len(".meta.json")]
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            meta = {}
+        files = [meta_path] + sorted(CACHE_DIR.glob(f"{key}.json")) + sorted(CACHE_DIR.glob(f"{key}-*.json"))
+        yield key, meta, files
+
+
+def is_stale(meta):
+    """True if a source file of the entry changed or disappeared"""
+    sources = meta.get('sources', {})
+    try:
+        return not sources or any(file_hash(file) != digest for file, digest in sources.items())
+    except OSError:
+        return True
+
+
+def matches(meta, method=None, site=None):
+    """True if the entry belongs to method (or one of its scenarios) and site"""
+    entry_method = meta.get('method', '')
+    if method and entry_method != method and not entry_method.startswith(method + '/'):
+        return False
+    return not site or meta.get('site') == site
+
+
+def invalidate(method=None, site=None, stale_only=False):
+    """Delete matching cache entries; returns the number of figures removed"""
+    removed = 0
+    for _, meta, files in cache_entries():
+        if not matches(meta, method, site) or (stale_only and not is_stale(meta)):
+            continue
+        for path in files:
+            path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def evict(max_bytes=None, max_age=None):
+    """Delete the entries older than max_age seconds, then the oldest ones
+    until the cache holds at most max_bytes; returns the number removed"""
+    now = time.time()
+    entries = []
+    for _, _, files in cache_entries():
+        stats = [path.stat() for path in files if path.exists()]
+        if stats:
+            entries.append((max(stat.st_mtime for stat in stats), sum(stat.st_size for stat in stats), files))
+    entries.sort(key=lambda entry: entry[0])
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for built, size, files in entries:
+        too_old = max_age is not None and now - built > max_age
+        too_big = max_bytes is not None and total > max_bytes
+        if not (too_old or too_big):
+            continue
+        for path in files:
+            path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    # Manage the figure cache from the project root:
+    #   python figure_cache.py list
+    #   python figure_cache.py invalidate [--method CoastSat] [--site CATALANGA] [--stale]
+    #   python figure_cache.py invalidate --max-mb 500 [--max-age-days 30]
+    #   python figure_cache.py rebuild [--method CoastSat] [--site CATALANGA]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the on-disk map figure cache")
+    parser.add_argument("command", choices=["list", "invalidate", "rebuild"])
+    parser.add_argument("--method", help="only entries of this method (e.g. CoastSat, Method4)")
+    parser.add_argument("--site", help="only entries of this site")
+    parser.add_argument("--stale", action="store_true", help="only entries whose source files changed")
+    parser.add_argument("--max-mb", type=float, help="delete the oldest entries until the cache fits in this size")
+    parser.add_argument("--max-age-days", type=float, help="delete the entries built longer ago than this")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for key, meta, files in cache_entries():
+            if not matches(meta, args.method, args.site):
+                continue
+            size = sum(path.stat().st_size for path in files)
+            figures = sum(1 for path in files[1:] if not path.name.endswith('.report.json'))
+            print(f"{key}  {meta.get('method', '?'):<24} {meta.get('site', '?'):<12} "
+                  f"{figures:3d} figures {size / 1024:9,.0f} KB  {meta.get('created', '')}"
+                  f"{'  (stale)' if is_stale(meta) else ''}")
+    elif args.command == "invalidate" and (args.max_mb is not None or args.max_age_days is not None):
+        removed = evict(
+            args.max_mb * 1024 ** 2 if args.max_mb is not None else None,
+            args.max_age_days * 86400 if args.max_age_days is not None else None
+        )
+        print(f"Removed {removed} cached figure(s) from {CACHE_DIR}")
+    else:
+        removed = invalidate(args.method, args.site, args.stale)
+        print(f"Removed {removed} cached figure(s) from {CACHE_DIR}")
+
+    if args.command == "rebuild":
+        # Run the dashboard once headless: every map panel is built with the
+        # default settings and written to the cache
+        from streamlit.testing.v1 import AppTest
+
+        start = time.perf_counter()
+        app = AppTest.from_file("app.py", default_timeout=600).run()
+        for exception in app.exception:
+            print(f"Error: {exception.message}")
+        print(f"Rebuilt the default map figures in {time.perf_counter() - start:.1f} s")
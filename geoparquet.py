@@ -0,0 +1,220 @@
+import functools
+import json
+import os
+from pathlib import Path
+
+from reproject import GEOGRAPHIC_CRS, to_crs_batch
+
+# CRS of the GeoParquet copies (what the map panels draw in)
+PARQUET_CRS = GEOGRAPHIC_CRS
+
+# Year columns renamed to 'year', and date columns a missing year is read from
+YEAR_COLUMNS = ['year', 'Year', 'YEAR']
+DATE_COLUMNS = ['date', 'Date']
+
+
+def parquet_path(path):
+    """GeoParquet copy of a shapefile: same folder and name, .parquet suffix"""
+    return Path(path).with_suffix('.parquet')
+
+
+def has_fresh_parquet(path):
+    """True if path has a GeoParquet copy at least as new as all its files"""
+    from data_sources import source_files
+
+    parquet = parquet_path(path)
+    if not parquet.exists():
+        return False
+    sources = [file for file in source_files(path) if file != parquet]
+    return all(os.stat(file).st_mtime_ns <= os.stat(parquet).st_mtime_ns for file in sources)
+
+
+def normalize_year(gdf):
+    """Store the year of each feature as an integer 'year' column.
+
+    Year/YEAR columns are renamed to 'year' and text years are parsed; a
+    layer with only a date column gets the year of that date. Layers
+    without either (transects, change polygons' start/end years) are
+    returned unchanged.
+    """
+    import pandas as pd
+
+    year = next((col for col in YEAR_COLUMNS if col in gdf.columns), None)
+    if year is not None:
+        gdf = gdf.rename(columns={year: 'year'})
+        if not pd.api.types.is_integer_dtype(gdf['year']):
+            gdf['year'] = pd.to_numeric(gdf['year'], errors='coerce').astype('Int64')
+        return gdf
+
+    date = next((col for col in DATE_COLUMNS if col in gdf.columns), None)
+    if date is not None:
+        gdf = gdf.copy()
+        gdf['year'] = pd.to_datetime(gdf[date], errors='coerce').dt.year.astype('Int64')
+    return gdf
+
+
+@functools.lru_cache(maxsize=16)
+def _crs_from_json(text):
+    """Parse a PROJJSON CRS once per process (pyproj takes ~40 ms per parse)"""
+    import pyproj
+
+    return pyproj.CRS.from_json(text)
+
+
+def read_geoparquet(path, columns=None, bbox=None):
+    """Read a GeoParquet copy written by convert().
+
+    Like geopandas.read_parquet, but the CRS of the geometry column is
+    parsed once per process instead of on every read. Only the attribute
+    columns listed in columns are read (all if None; names the file lacks
+    are skipped). bbox = (minx, miny, maxx, maxy), in the file's CRS, keeps
+    the features whose bounding box intersects it; with a bbox covering
+    column the other row groups are never decoded.
+    """
+    import geopandas as gpd
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    import shapely
+
+    schema = pq.read_schema(path)
+    geo = json.loads(schema.metadata[b'geo'])
+    name = geo['primary_column']
+    covering = geo['columns'][name].get('covering', {}).get('bbox')
+    if columns is not None:
+        columns = [col for col in schema.names if col in columns or col == name]
+
+    filters = None
+    if bbox is not None and covering:
+        minx, miny, maxx, maxy = bbox
+        bound = lambda side: pc.field(*covering[side])
+        filters = (
+            (bound('xmax') >= minx) & (bound('xmin') <= maxx)
+            & (bound('ymax') >= miny) & (bound('ymin') <= maxy)
+        )
+    table = pq.read_table(path, columns=columns, filters=filters)
+    if covering and covering['xmin'][0] in table.column_names:
+        table = table.drop_columns([covering['xmin'][0]])
+
+    crs = geo['columns'][name].get('crs')
+    # GeoParquet files without a crs are in OGC:CRS84
+    crs = _crs_from_json(json.dumps(crs)) if crs is not None else "OGC:CRS84"
+    geometry = gpd.GeoSeries.from_wkb(table.column(name).to_numpy(zero_copy_only=False), crs=crs)
+    if bbox is not None and not covering:
+        # Copies written before the covering column: filter after decoding
+        keep = shapely.intersects(shapely.box(*bbox), shapely.envelope(geometry.values))
+        table, geometry = table.filter(keep), geometry[keep].reset_index(drop=True)
+    df = table.drop_columns([name]).to_pandas()
+    df.insert(table.schema.get_field_index(name), name, geometry.values)
+    return gpd.GeoDataFrame(df, geometry=name, crs=crs)
+
+
+def _source_bbox(bbox, bbox_crs, crs):
+    """bbox (in bbox_crs) as the bounds it covers in crs"""
+    if bbox is None or bbox_crs is None:
+        return bbox
+    from reproject import transformer
+
+    return transformer(bbox_crs, crs).transform_bounds(*bbox)
+
+
+def _shapefile_columns(fields, columns):
+    """Fields of a shapefile to read for columns (named after normalize_year)"""
+    if columns is None:
+        return None
+    wanted = set(columns)
+    if 'year' in wanted:
+        # The year may be stored as Year/YEAR or only as a date
+        wanted.update(YEAR_COLUMNS + DATE_COLUMNS)
+    return [field for field in fields if field in wanted]
+
+
+def read_layer(path, crs=PARQUET_CRS, columns=None, bbox=None, bbox_crs=GEOGRAPHIC_CRS):
+    """Read a layer from its GeoParquet copy when fresh, else from the shapefile.
+
+    Empty geometries are dropped and the result is in crs (crs=None keeps
+    the CRS the layer is stored in). The shapefile fallback gets the same
+    year normalization as the GeoParquet copies.
+
+    columns limits the attribute columns read (names a layer lacks are
+    skipped) and bbox = (minx, miny, maxx, maxy) in bbox_crs keeps only the
+    features whose bounding box intersects it. Shapefiles are then read
+    through pyogrio's Arrow path, so skipped DBF fields are never parsed.
+    """
+    import geopandas as gpd
+
+    if has_fresh_parquet(path):
+        gdf = read_geoparquet(parquet_path(path), columns, _source_bbox(bbox, bbox_crs, PARQUET_CRS))
+    elif columns is None and bbox is None:
+        gdf = normalize_year(gpd.read_file(path))
+    else:
+        import pyogrio
+
+        info = pyogrio.read_info(path)
+        gdf = normalize_year(gpd.read_file(
+            path,
+            engine='pyogrio',
+            use_arrow=True,
+            columns=_shapefile_columns(info['fields'], columns),
+            bbox=_source_bbox(bbox, bbox_crs, info['crs']) if bbox is not None else None
+        ))
+        if columns is not None:
+            # Drop the date a year was read from unless it was asked for
+            gdf = gdf[[col for col in gdf.columns if col in columns or col == gdf.geometry.name]]
+    gdf = gdf[gdf.geometry.notna()]
+    if crs is not None:
+        gdf, = to_crs_batch([gdf], crs)
+    return gdf
+
+
+def convert(path, parquet=None):
+    """Write the GeoParquet copy of a shapefile (to parquet, or next to it); returns its path"""
+    import geopandas as gpd
+
+    from data_sources import temporary_path
+
+    gdf = gpd.read_file(path)
+    gdf, = to_crs_batch([normalize_year(gdf[gdf.geometry.notna()])], PARQUET_CRS)
+    parquet = Path(parquet) if parquet is not None else parquet_path(path)
+    tmp = temporary_path(parquet)
+    # The bbox covering column lets bbox reads skip row groups unread
+    gdf.to_parquet(tmp, index=False, write_covering_bbox=True)
+    os.replace(tmp, parquet)
+    return parquet
+
+
+def find_shapefiles(root):
+    """Shapefiles under root/<method>/<site>/, including scenario subfolders"""
+    return sorted(Path(root).rglob("*.shp"))
+
+
+if __name__ == "__main__":
+    # Convert every shapefile under data/ to GeoParquet:
+    #   python geoparquet.py [data] [--force] [--benchmark]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write GeoParquet copies of the shapefiles")
+    parser.add_argument("root", nargs="?", default="data")
+    parser.add_argument("--force", action="store_true", help="rewrite copies that are up to date")
+    parser.add_argument("--benchmark", action="store_true", help="time shapefile vs GeoParquet loads")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import geopandas as gpd
+
+    from bench import best_time
+
+    for path in find_shapefiles(args.root):
+        if args.force or not has_fresh_parquet(path):
+            print(f"{path} -> {convert(path)}")
+
+    if args.benchmark:
+        print(f"{'layer':<60} {'shapefile':>10} {'parquet':>10}")
+        totals = [0, 0]
+        for path in find_shapefiles(args.root):
+            times = [
+                best_time(lambda: normalize_year(gpd.read_file(path)).to_crs(PARQUET_CRS), args.repeat),
+                best_time(lambda: read_geoparquet(parquet_path(path)), args.repeat)
+            ]
+            totals = [total + ms for total, ms in zip(totals, times)]
+            print(f"{str(path):<60} {times[0]:8.1f} ms {times[1]:7.1f} ms")
+        print(f"{'total':<60} {totals[0]:8.1f} ms {totals[1]:7.1f} ms")
@@ -0,0 +1,388 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import shapely
+
+from dataset_cache import cached_dataset
+from transect_statistics import group_median
+
+# Fields a transect's name is read from, in order of preference (else its
+# position, from 1)
+TRANSECT_NAME_FIELDS = ('name', 'transect', 'Transect', 'FID', 'id')
+
+# Methods without transects of their own, and the method whose transects
+# they use (the predictions continue Method 4's shorelines)
+SHARED_TRANSECTS = {'Prediction/Pre1': 'Method4'}
+
+# How a shoreline's distance along a transect is measured: from its
+# vertices within ALONGSHORE_DISTANCE of the transect (CoastSat's method)
+# or from the points where the shoreline line crosses the transect
+INTERSECTION_METHODS = ('vertices', 'crossings')
+
+# Half-width (m) of the corridor along a transect's line whose shoreline
+# vertices are used, their largest distance (m) from its origin, and the
+# fewest vertices that make an intersection (CoastSat's along_dist,
+# max_dist_ref and min_points settings)
+ALONGSHORE_DISTANCE = 25
+ORIGIN_DISTANCE = 1000
+MIN_POINTS = 3
+
+# CoastSat's quality control of the vertex corridor: a shoreline whose
+# corridor vertices spread more than MAX_STD (standard deviation) or
+# MAX_RANGE (m) crosses the transect more than once. On transects where
+# that happens for more than MULTIPLE_SHARE of the shorelines it counts at
+# its most seaward vertex, elsewhere not at all; distances below
+# MIN_CHAINAGE (m, landward of the origin) are dropped (CoastSat's
+# max_std, max_range, prc_multiple and min_chainage settings, with
+# multiple_inter='auto')
+MAX_STD = 15
+MAX_RANGE = 30
+MULTIPLE_SHARE = 0.1
+MIN_CHAINAGE = -100
+
+# The end of a transect distances are measured from
+ORIGINS = ('first', 'last')
+
+# How the distances of one shoreline and transect become one value
+DISTANCE_REDUCTIONS = ('median', 'min', 'max')
+
+# How each method's intersections are measured (compute_intersections
+# arguments; crossings from the first vertex otherwise), as checked
+# against the shipped intersections layers: both come from the vertex
+# corridor and its quality control, Microsoft's from the vertices ahead of
+# the transect origin only
+INTERSECTION_CONVENTIONS = {
+    'CoastSat': {'method': 'vertices'},
+    'Coastsat': {'method': 'vertices'},
+    'Microsoft': {'method': 'vertices', 'ahead_only': True}
+}
+
+# Computed intersections layers drawn on the map panels of sites without
+# one, one GeoParquet file per shoreline and transect content and convention
+INTERSECTIONS_DIR = Path(".cache/intersections")
+
+# Bump when the computed intersections change so older files are rewritten
+INTERSECTIONS_VERSION = 1
+
+
+def transect_names(transects):
+    """Name of every transect, as text"""
+    field = next((field for field in TRANSECT_NAME_FIELDS if field in transects.columns), None)
+    if field is None:
+        return np.array([str(i + 1) for i in range(len(transects))], dtype=object)
+    return transects[field].astype(str).to_numpy(dtype=object)
+
+
+def shoreline_dates(shorelines):
+    """Date of every shoreline as text: its date field, else 1 January of its year"""
+    if 'date' in shorelines.columns:
+        return shorelines['date'].astype(str).to_numpy(dtype=object)
+    return (shorelines['year'].astype('Int64').astype(str) + '-01-01').to_numpy(dtype=object)
+
+
+def _axes(lines):
+    """Origin (first vertex) of every transect and the unit vector towards its end"""
+    origin = shapely.get_coordinates(shapely.get_point(lines, 0))
+    direction = shapely.get_coordinates(shapely.get_point(lines, -1)) - origin
+    return origin, direction / np.hypot(direction[:, 0], direction[:, 1])[:, None]
+
+
+def _points_along(lines, distance):
+    """Points at distance along every transect; before its origin or past its
+    end they lie on the straight line through its ends"""
+    origin, direction = _axes(lines)
+    points = shapely.line_interpolate_point(lines, distance)
+    outside = (distance < 0) | (distance > shapely.length(lines))
+    points[outside] = shapely.points(origin[outside] + distance[outside, None] * direction[outside])
+    return points
+
+
+def _vertex_distances(lines, shores, ahead_only=False):
+    """(transect, shoreline, distance) of every shoreline vertex near a transect.
+
+    As in CoastSat, the distance is the vertex's projection on the straight
+    line from the transect's origin to its end, so it may fall before the
+    origin or past the end; ahead_only drops the vertices before it (as
+    later CoastSat versions do).
+    """
+    coords, owner = shapely.get_coordinates(shores, return_index=True)
+    origin, direction = _axes(lines)
+    line_index, vertex_index = shapely.STRtree(shapely.points(coords)).query(
+        shapely.points(origin), predicate='dwithin', distance=ORIGIN_DISTANCE
+    )
+    offset = coords[vertex_index] - origin[line_index]
+    along = (offset * direction[line_index]).sum(axis=1)
+    across = offset[:, 0] * direction[line_index, 1] - offset[:, 1] * direction[line_index, 0]
+    keep = np.abs(across) <= ALONGSHORE_DISTANCE
+    if ahead_only:
+        keep &= along > 0
+    return line_index[keep], owner[vertex_index[keep]], along[keep]
+
+
+def _quality_control(along, starts, n, line_index, distance, shoreline_count, transect_count):
+    """Distances of the (transect, shoreline) pairs after CoastSat's quality
+    control of their corridor vertices (along, grouped at starts, n long);
+    NaN where rejected"""
+    lowest, highest = np.minimum.reduceat(along, starts), np.maximum.reduceat(along, starts)
+    mean = np.add.reduceat(along, starts) / n
+    std = np.sqrt(np.add.reduceat((along - np.repeat(mean, n)) ** 2, starts) / n)
+    good = (std <= MAX_STD) & (highest - lowest <= MAX_RANGE)
+    # Share of every transect's shorelines that cross it more than once
+    multiple = np.bincount(line_index, weights=std > MAX_STD, minlength=transect_count) / shoreline_count
+    distance = np.where(good, distance, np.where(multiple[line_index] > MULTIPLE_SHARE, highest, np.nan))
+    distance[(n < MIN_POINTS) | (distance < MIN_CHAINAGE)] = np.nan
+    return distance
+
+
+def _crossing_distances(lines, shores):
+    """(transect, shoreline, distance) of every point where a shoreline crosses a transect"""
+    line_index, shore_index = shapely.STRtree(shores).query(lines, predicate='intersects')
+    points, pair = shapely.get_parts(shapely.intersection(lines[line_index], shores[shore_index]), return_index=True)
+    # A shoreline running along a transect counts at the middle of the overlap
+    points = np.where(shapely.get_type_id(points) == 0, points, shapely.centroid(points))
+    return line_index[pair], shore_index[pair], shapely.line_locate_point(lines[line_index[pair]], points)
+
+
+def compute_intersections(shorelines, transects, method='crossings', reduce='median', crs=None, origin='first',
+                          ahead_only=False):
+    """Intersections of every transect with every shoreline, in one pass.
+
+    An STRtree query picks, for all transects at once, the shorelines
+    crossing each transect (method='crossings') or the shoreline vertices
+    within ALONGSHORE_DISTANCE of its line (method='vertices', as CoastSat
+    does, for densely digitized shorelines); one vectorized call then
+    gives their cross-shore distances from the transect's origin, its
+    first vertex or (origin='last') its last. The distances of each
+    transect and shoreline are reduced to their median (or min or max);
+    with 'vertices', the pairs then go through CoastSat's quality control
+    (MIN_POINTS, MAX_STD, MAX_RANGE, MULTIPLE_SHARE, MIN_CHAINAGE), and
+    ahead_only keeps only the vertices ahead of the origin.
+
+    Returns a GeoDataFrame with the columns of the CoastSat intersections
+    layers (transect, date, year, distance, plus satellite when the
+    shorelines have it), sorted by transect and shoreline. Distances are
+    measured in crs (default: the transects' CRS, or its UTM zone if it
+    is geographic), which the points are returned in.
+    """
+    import geopandas as gpd
+
+    from reproject import projected_crs, to_crs_batch
+
+    if method not in INTERSECTION_METHODS:
+        raise ValueError(f"Unknown intersection method: {method!r}")
+    if reduce not in DISTANCE_REDUCTIONS:
+        raise ValueError(f"Unknown distance reduction: {reduce!r}")
+    if origin not in ORIGINS:
+        raise ValueError(f"Unknown transect origin: {origin!r}")
+    transects = transects[transects.geometry.notna()]
+    shorelines = shorelines[shorelines.geometry.notna()]
+    transects, shorelines = to_crs_batch([transects, shorelines], crs or projected_crs(transects))
+
+    lines = np.asarray(transects.geometry.values, dtype=object)
+    if origin == 'last':
+        lines = shapely.reverse(lines)
+    shores = np.asarray(shorelines.geometry.values, dtype=object)
+    if method == 'vertices':
+        line_index, shore_index, along = _vertex_distances(lines, shores, ahead_only)
+    else:
+        line_index, shore_index, along = _crossing_distances(lines, shores)
+
+    # Group the distances by (transect, shoreline) pair
+    key = line_index.astype('int64') * len(shores) + shore_index
+    order = np.argsort(key, kind='stable')
+    key, along = key[order], along[order]
+    pairs, starts, n = np.unique(key, return_index=True, return_counts=True)
+    if reduce == 'median':
+        distance = group_median(along, np.repeat(np.arange(len(pairs)), n), starts, n)
+    else:
+        distance = getattr(np, f"{reduce}imum").reduceat(along, starts)
+    if method == 'vertices':
+        distance = _quality_control(along, starts, n, pairs // len(shores), distance, len(shores), len(lines))
+        keep = ~np.isnan(distance)
+        pairs, distance = pairs[keep], distance[keep]
+    line_index, shore_index = pairs // len(shores), pairs % len(shores)
+
+    columns = {
+        'transect': transect_names(transects)[line_index],
+        'date': shoreline_dates(shorelines)[shore_index],
+        'year': shorelines['year'].to_numpy()[shore_index],
+        'distance': distance
+    }
+    if 'satellite' in shorelines.columns:
+        columns['satellite'] = shorelines['satellite'].to_numpy(dtype=object)[shore_index]
+    return gpd.GeoDataFrame(
+        columns,
+        geometry=_points_along(lines[line_index], distance),
+        crs=transects.crs
+    )
+
+
+@cached_dataset
+def load_intersections(shorelines_path, transects_path, crs=None, method='crossings', origin='first', ahead_only=False):
+    """Intersections computed from a shoreline and a transect layer (cached, shared)"""
+    from geoparquet import read_layer
+
+    return compute_intersections(
+        read_layer(shorelines_path, crs=None, columns=('year', 'date', 'satellite')),
+        read_layer(transects_path, crs=None, columns=TRANSECT_NAME_FIELDS),
+        method, crs=crs, origin=origin, ahead_only=ahead_only
+    )
+
+
+def find_transects(catalog, method, site):
+    """Path of the transects a method's site is measured along, or None"""
+    path = catalog.find(method, site, 'transects')
+    if path is None and method in SHARED_TRANSECTS:
+        path = catalog.find(SHARED_TRANSECTS[method], site, 'transects')
+    return path
+
+
+def site_intersections(catalog, method, site, layer='shorelines', scenario=None):
+    """Intersections of a method's site: its intersections layer, else computed
+    from its shorelines (layer, in scenario) and transects with the method's
+    INTERSECTION_CONVENTIONS; None if it has neither"""
+    from geoparquet import read_layer
+
+    if layer == 'shorelines' and scenario is None:
+        path = catalog.find(method, site, 'intersections')
+        if path is not None:
+            return read_layer(str(catalog.source(path)), crs=None)
+    shorelines = catalog.find(method, site, layer, scenario)
+    transects = find_transects(catalog, method, site)
+    if shorelines is None or transects is None:
+        return None
+    # Measured in the CRS the transects were drawn in (the store copies are WGS84)
+    crs = catalog.entry_for(transects)['crs']
+    convention = INTERSECTION_CONVENTIONS.get(method, {})
+    return load_intersections(str(catalog.source(shorelines)), str(catalog.source(transects)), crs, **convention)
+
+
+def computed_intersections_path(catalog, method, site, layer='shorelines', scenario=None):
+    """GeoParquet file of the intersections computed from a method's shorelines
+    (layer, in scenario) and transects, or None if it lacks either.
+
+    Written under INTERSECTIONS_DIR on first use and added to catalog as a
+    derived dataset, so the map panels draw it like a shipped layer.
+    """
+    from data_sources import temporary_path
+
+    shorelines = catalog.find(method, site, layer, scenario)
+    transects = find_transects(catalog, method, site)
+    if shorelines is None or transects is None:
+        return None
+    convention = INTERSECTION_CONVENTIONS.get(method, {})
+    digest = hashlib.sha256(json.dumps([
+        INTERSECTIONS_VERSION, catalog.entry_for(shorelines)['hash'], catalog.entry_for(transects)['hash'], convention
+    ], sort_keys=True).encode()).hexdigest()
+    path = INTERSECTIONS_DIR / f"{digest}.parquet"
+
+    if not path.exists():
+        # Measured in the CRS the transects were drawn in (the store copies are WGS84)
+        result = load_intersections(
+            str(catalog.source(shorelines)), str(catalog.source(transects)),
+            catalog.entry_for(transects)['crs'], **convention
+        )
+        INTERSECTIONS_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = temporary_path(path)
+        result.to_parquet(tmp, index=False, write_covering_bbox=True)
+        os.replace(tmp, path)
+
+    if catalog.entry_for(path) is None:
+        import pyarrow.parquet as pq
+
+        fields = [field for field in pq.read_schema(path).names if field not in ('geometry', 'bbox')]
+        catalog.add_derived({
+            'path': str(path), 'method': method, 'site': site, 'scenario': scenario, 'layer': 'intersections',
+            'kind': 'shapefile', 'files': {str(path): digest}, 'hash': digest, 'stored': None,
+            'fields': fields, 'year_field': 'year'
+        })
+    return path
+
+
+def match_intersections(computed, shipped):
+    """Pairs of computed and shipped intersections of the same transect and date.
+
+    Points sharing a transect and date (scenes of one day) are paired in
+    order, so every point is matched at most once.
+    """
+    keys = ['transect', 'date']
+    computed = computed.assign(date=computed['date'].astype(str), occurrence=computed.groupby(keys).cumcount())
+    shipped = shipped.assign(date=shipped['date'].astype(str), occurrence=shipped.groupby(keys).cumcount())
+    return computed.merge(shipped.drop(columns='geometry'), on=keys + ['occurrence'], suffixes=('', '_shipped'))
+
+
+# Largest difference (m) from a shipped distance that still counts as a
+# match (the shipped distances are rounded to the centimetre)
+COMPARE_TOLERANCE = 0.01
+
+
+if __name__ == "__main__":
+    # Compute the intersections of every catalogued shoreline layer:
+    #   python intersections.py [data] [--method Method3] [--output-dir out] [--compare]
+    import argparse
+    import sys
+    import time
+    from pathlib import Path
+
+    from catalog import DATA_ROOT, load_catalog
+    from geoparquet import read_layer
+
+    parser = argparse.ArgumentParser(description="Intersect shorelines with transects")
+    parser.add_argument("root", nargs="?", default=DATA_ROOT)
+    parser.add_argument("--method", help="only this method")
+    parser.add_argument("--intersection-method", choices=INTERSECTION_METHODS, help="default: the method's convention")
+    parser.add_argument("--origin", choices=ORIGINS, help="default: the method's convention")
+    parser.add_argument("--reduce", choices=DISTANCE_REDUCTIONS, default='median')
+    parser.add_argument("--output-dir", help="write each result as <method>_<site>[_<scenario>]_<layer>_intersections.parquet")
+    parser.add_argument("--compare", action="store_true", help="compare with the shipped intersections layers "
+                        "(exit status 1 if a shipped point is missing or off by more than --tolerance)")
+    parser.add_argument("--tolerance", type=float, default=COMPARE_TOLERANCE, help="metres")
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.root)
+    failed = False
+    for entry in catalog.datasets:
+        if not entry['layer'].startswith('shorelines') or args.method not in (None, entry['method']):
+            continue
+        transects = find_transects(catalog, entry['method'], entry['site'])
+        if transects is None:
+            print(f"{entry['path']:<64} no transects")
+            continue
+        shorelines, lines = read_layer(catalog.source(entry['path']), crs=None), read_layer(catalog.source(transects), crs=None)
+        convention = dict(INTERSECTION_CONVENTIONS.get(entry['method'], {}))
+        if args.intersection_method:
+            convention['method'] = args.intersection_method
+        if args.origin:
+            convention['origin'] = args.origin
+        start = time.perf_counter()
+        result = compute_intersections(
+            shorelines, lines, reduce=args.reduce, crs=catalog.entry_for(transects)['crs'], **convention
+        )
+        ms = (time.perf_counter() - start) * 1000
+        report = f"{entry['path']:<64} {len(lines):4d} transects x {len(shorelines):4d} shorelines -> {len(result):6d} points in {ms:6.1f} ms"
+
+        shipped = catalog.find(entry['method'], entry['site'], 'intersections')
+        if args.compare and shipped is not None and entry['scenario'] is None:
+            shipped = read_layer(catalog.source(shipped), crs=None)
+            merged = match_intersections(result, shipped)
+            error = (merged['distance'] - merged['distance_shipped']).abs()
+            off = int((error > args.tolerance).sum())
+            # Computed points missing from the shipped layer were dropped by
+            # the exporting tool's own filters (CoastSat rejects whole images
+            # and despikes the series after intersecting)
+            report += (f" | shipped {len(shipped)}, matched {len(merged)}, not shipped {len(result) - len(merged)},"
+                       f" distance error median {error.median():.2f} m, max {error.max():.2f} m,"
+                       f" {off} over {args.tolerance:g} m")
+            failed |= off > 0 or len(merged) < len(shipped)
+        print(report)
+
+        if args.output_dir:
+            name = "_".join(part for part in (
+                entry['method'].replace('/', '_'), entry['site'], entry['scenario'], entry['layer']
+            ) if part)
+            Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+            result.to_parquet(Path(args.output_dir) / f"{name}_intersections.parquet", index=False)
+    sys.exit(1 if failed else 0)
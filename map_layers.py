@@ -0,0 +1,413 @@
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+import shapely
+from plotly.utils import PlotlyJSONEncoder
+
+# Colour scheme and labels of each method's map panel
+MAP_STYLES = {
+    'CoastSat': {
+        'suffix': '',
+        'colors': {
+            'transects': 'rgba(0, 128, 0, 0.5)',
+            'shorelines': 'blue',
+            'intersections': 'orange',
+            'change_polygons': 'rgba(0, 150, 136, 0.8)'
+        },
+        'margin_top': 40
+    },
+    'Microsoft': {
+        'suffix': ' (Microsoft)',
+        'colors': {
+            'transects': 'rgba(255, 107, 107, 0.5)',
+            'shorelines': 'purple',
+            'intersections': 'red',
+            'change_polygons': 'rgba(255, 152, 0, 0.8)'
+        },
+        'margin_top': 40
+    },
+    'Method3': {
+        'suffix': ' (Method 3)',
+        'colors': {
+            'transects': 'rgba(255, 193, 7, 0.5)',
+            'shorelines': 'darkred',
+            'intersections': 'darkorange'
+        }
+    }
+}
+
+# Decimal places kept in the map coordinates (5 decimals is about 1 m)
+COORD_PRECISION = 5
+
+# Hover title of a single feature of each layer
+LAYER_TITLES = {
+    'transects': 'Transect',
+    'shorelines': 'Shoreline',
+    'intersections': 'Intersection',
+    'change_polygons': 'Change Polygon'
+}
+
+
+def _geometry_array(gdf):
+    """Return the geometries of a GeoDataFrame as a shapely object array"""
+    return np.asarray(gdf.geometry.values, dtype=object)
+
+
+def hover_fields(gdf, title):
+    """Build the hover data of a layer column-wise.
+
+    Returns (customdata, hovertemplate): customdata holds one row of
+    attribute values (as strings) per feature and the template, shared by
+    every feature of the layer, labels them.
+    """
+    columns = [col for col in gdf.columns if col != 'geometry']
+    customdata = np.empty((len(gdf), len(columns)), dtype=object)
+    for i, col in enumerate(columns):
+        customdata[:, i] = gdf[col].astype(str).to_numpy()
+    hovertemplate = f"<b>{title}</b><br>" + "".join(
+        f"{col}: %{{customdata[{i}]}}<br>" for i, col in enumerate(columns)
+    ) + "<extra></extra>"
+    return customdata, hovertemplate
+
+
+def line_coordinates(gdf):
+    """Pull the vertices of every LineString part of a layer in bulk.
+
+    Returns (coords, part_feature, offsets): coords is an (n, 2) array of
+    all vertices, part_feature the row position of each part's feature and
+    offsets the index of each part's first vertex in coords, followed by n.
+    """
+    parts, part_feature = shapely.get_parts(_geometry_array(gdf), return_index=True)
+
+    # Keep LineStrings and LinearRings only
+    is_line = np.isin(shapely.get_type_id(parts), (1, 2))
+    parts = parts[is_line]
+    part_feature = part_feature[is_line]
+
+    coords = shapely.get_coordinates(parts)
+    offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    np.cumsum(shapely.get_num_coordinates(parts), out=offsets[1:])
+    return coords, part_feature, offsets
+
+
+def gap_separated(coords, offsets):
+    """Insert a NaN row after every part so one trace can draw all parts"""
+    n_parts = len(offsets) - 1
+    vertex_part = np.repeat(np.arange(n_parts), np.diff(offsets))
+    out = np.full((len(coords) + n_parts, 2), np.nan)
+    # Vertex i of part p moves down by p rows to leave room for the gaps
+    out[np.arange(len(coords)) + vertex_part] = coords
+    return out
+
+
+def compact_lines(coords, offsets, precision):
+    """Round the vertices of a line layer and drop consecutive duplicates.
+
+    Vertices that round onto their predecessor in the same part add nothing
+    to the drawing; each part keeps its first vertex. Returns the kept
+    coords and the matching offsets.
+    """
+    coords = coords.round(precision)
+    keep = np.ones(len(coords), dtype=bool)
+    keep[1:] = (coords[1:] != coords[:-1]).any(axis=1)
+    keep[offsets[:-1]] = True
+    kept_before = np.zeros(len(coords) + 1, dtype=np.int64)
+    np.cumsum(keep, out=kept_before[1:])
+    return coords[keep], kept_before[offsets]
+
+
+def coordinate_array(values, precision):
+    """Encode one coordinate axis for Plotly.
+
+    With precision=None the values are sent as before, as a full-precision
+    list that becomes JSON text. Otherwise they are rounded and passed as a
+    typed NumPy array, which plotly serializes as base64 binary: float32
+    when its step at the largest magnitude among values is within that many
+    decimals (5 decimals hold below 128 degrees, 4 up to 180), else float64.
+    """
+    if precision is None:
+        return values.tolist()
+    values = values.round(precision)
+    # Gaps between parts are NaN
+    finite = np.abs(values[np.isfinite(values)])
+    largest = np.float32(finite.max() if len(finite) else 0)
+    dtype = np.float32 if np.spacing(largest) <= 10.0 ** -precision else np.float64
+    return values.astype(dtype)
+
+
+def hover_anchors(offsets, hover_step):
+    """Return the vertex indices that carry hover text.
+
+    Every hover_step-th vertex of each part is an anchor, plus the part's
+    last vertex so short parts (transects) are hoverable at both ends.
+    """
+    counts = np.diff(offsets)
+    vertex_part = np.repeat(np.arange(len(counts)), counts)
+    position = np.arange(offsets[-1]) - offsets[vertex_part]
+    is_anchor = (position % hover_step == 0) | (position == counts[vertex_part] - 1)
+    return np.flatnonzero(is_anchor), vertex_part
+
+
+def line_layer_traces(gdf, title, color, legendgroup, width=2, merged=True, hover_step=10,
+                      precision=COORD_PRECISION):
+    """Build map traces for a line layer.
+
+    With merged=True the layer is drawn as two traces whatever the number of
+    features: one line trace holding every part (separated by gaps) and
+    one invisible marker trace carrying the per-feature hover data on every
+    hover_step-th vertex. With merged=False one trace is built per
+    LineString part.
+
+    Coordinates are compacted to precision decimals (see coordinate_array);
+    precision=None keeps the full-precision lists.
+    """
+    line = dict(width=width, color=color)
+    coords, part_feature, offsets = line_coordinates(gdf)
+    if precision is not None:
+        coords, offsets = compact_lines(coords, offsets, precision)
+    customdata, hovertemplate = hover_fields(gdf, title)
+
+    if not merged:
+        return [
+            go.Scattermapbox(
+                lon=coordinate_array(coords[start:end, 0], precision),
+                lat=coordinate_array(coords[start:end, 1], precision),
+                mode='lines',
+                line=line,
+                showlegend=False,
+                customdata=np.repeat(customdata[feature:feature + 1], end - start, axis=0),
+                hovertemplate=hovertemplate,
+                legendgroup=legendgroup
+            )
+            for start, end, feature in zip(offsets[:-1], offsets[1:], part_feature)
+        ]
+
+    lines = gap_separated(coords, offsets)
+    anchors, vertex_part = hover_anchors(offsets, hover_step)
+
+    return [
+        go.Scattermapbox(
+            lon=coordinate_array(lines[:, 0], precision),
+            lat=coordinate_array(lines[:, 1], precision),
+            mode='lines',
+            line=line,
+            showlegend=False,
+            hoverinfo='skip',
+            legendgroup=legendgroup
+        ),
+        go.Scattermapbox(
+            lon=coordinate_array(coords[anchors, 0], precision),
+            lat=coordinate_array(coords[anchors, 1], precision),
+            mode='markers',
+            marker=dict(size=width * 4, color=color, opacity=0),
+            showlegend=False,
+            customdata=customdata[part_feature[vertex_part[anchors]]],
+            hovertemplate=hovertemplate,
+            legendgroup=legendgroup
+        )
+    ]
+
+
+def point_layer_trace(gdf, title, color, legendgroup, size=8, precision=COORD_PRECISION):
+    """Build a single marker trace for a point layer"""
+    geoms = _geometry_array(gdf)
+    present = ~shapely.is_missing(geoms)
+    customdata, hovertemplate = hover_fields(gdf, title)
+
+    return go.Scattermapbox(
+        lon=coordinate_array(shapely.get_x(geoms[present]), precision),
+        lat=coordinate_array(shapely.get_y(geoms[present]), precision),
+        mode='markers',
+        marker=dict(size=size, color=color),
+        showlegend=False,
+        customdata=customdata[present],
+        hovertemplate=hovertemplate,
+        legendgroup=legendgroup
+    )
+
+
+def legend_trace(name, color, legendgroup, lon, lat, mode='lines', width=2):
+    """Build a one-point trace that only provides a legend entry"""
+    if mode == 'markers':
+        style = dict(marker=dict(size=width * 4, color=color))
+    else:
+        style = dict(line=dict(width=width, color=color))
+    return go.Scattermapbox(
+        lon=[lon],
+        lat=[lat],
+        mode=mode,
+        name=name,
+        showlegend=True,
+        visible=True,
+        legendgroup=legendgroup,
+        hoverinfo='skip',
+        **style
+    )
+
+
+def year_frames(years, year_traces, first_trace):
+    """Build one animation frame per year holding only the per-year traces.
+
+    year_traces(year) returns the traces that change between years; they
+    replace the figure traces starting at index first_trace, so static
+    layers (legend entries, transects) are never repeated in the frames.
+    """
+    frames = []
+    for year in years:
+        frame_data = year_traces(year)
+        frames.append(go.Frame(
+            data=frame_data,
+            traces=list(range(first_trace, first_trace + len(frame_data))),
+            name=str(year)
+        ))
+    return frames
+
+
+def payload_report(fig, static_traces):
+    """Describe the serialized figure size and what delta-only frames save"""
+    size = len(fig.to_json())
+    if not fig.frames:
+        return f"Figure JSON: {size / 1024:,.0f} KB for one year (no animation frames)"
+
+    static_size = len(json.dumps(
+        [trace.to_plotly_json() for trace in static_traces],
+        cls=PlotlyJSONEncoder
+    ))
+    # Every frame used to embed the static traces as well
+    saved = static_size * len(fig.frames)
+    return (
+        f"Figure JSON: {size / 1024:,.0f} KB for {len(fig.frames)} frames · "
+        f"static layers kept out of frames save {saved / 1024:,.0f} KB "
+        f"({saved / (size + saved):.0%})"
+    )
+
+
+def traces_json_size(traces):
+    """Size of traces as Streamlit serializes them (typed arrays as base64)"""
+    data = [trace if isinstance(trace, dict) else trace.to_plotly_json() for trace in traces]
+    return len(pio.to_json({'data': data}, validate=False))
+
+
+def compaction_report(before, after, precision):
+    """Describe the trace bytes saved by coordinate compaction"""
+    if precision is None:
+        return f"Layer traces: {after / 1024:,.0f} KB, coordinates uncompacted"
+    return (
+        f"Layer traces with {precision}-decimal binary coordinates: "
+        f"{before / 1024:,.0f} KB → {after / 1024:,.0f} KB "
+        f"(-{1 - after / before:.0%})"
+    )
+
+
+def animation_controls(years):
+    """Play/pause buttons and year slider for client-side animation"""
+    return dict(
+        updatemenus=[{
+            'type': 'buttons',
+            'showactive': False,
+            'bgcolor': '#ffffff',
+            'bordercolor': '#d0d5dd',
+            'borderwidth': 2,
+            'font': dict(color='#000000'),
+            'buttons': [
+                {
+                    'label': '▶ Play',
+                    'method': 'animate',
+                    'args': [None, {
+                        'frame': {'duration': 1000, 'redraw': True},
+                        'fromcurrent': True,
+                        'mode': 'immediate',
+                        'transition': {'duration': 300}
+                    }]
+                },
+                {
+                    'label': '⏸ Pause',
+                    'method': 'animate',
+                    'args': [[None], {
+                        'frame': {'duration': 0, 'redraw': False},
+                        'mode': 'immediate',
+                        'transition': {'duration': 0}
+                    }]
+                }
+            ],
+            'x': 0.1,
+            'y': 0,
+            'xanchor': 'left',
+            'yanchor': 'bottom'
+        }],
+        sliders=[{
+            'active': len(years) - 1,
+            'bgcolor': '#ffffff',
+            'bordercolor': '#d0d5dd',
+            'borderwidth': 2,
+            'tickcolor': '#000000',
+            'font': dict(color='#000000'),
+            'steps': [
+                {
+                    'args': [[str(year)], {
+                        'frame': {'duration': 0, 'redraw': True},
+                        'mode': 'immediate',
+                        'transition': {'duration': 0}
+                    }],
+                    'label': str(year),
+                    'method': 'animate'
+                }
+                for year in years
+            ],
+            'x': 0.1,
+            'y': 0,
+            'len': 0.85,
+            'xanchor': 'left',
+            'yanchor': 'top',
+            'pad': {'b': 10, 't': 50},
+            'currentvalue': {
+                'visible': True,
+                'prefix': 'Year: ',
+                'xanchor': 'right',
+                'font': {'size': 16, 'color': '#000000'}
+            }
+        }]
+    )
+
+
+if __name__ == "__main__":
+    # Benchmark the layer builders on their own:
+    #   python map_layers.py data/Microsoft/CATALANGA/CATALANGA_shorelines.shp
+    import argparse
+    import warnings
+
+    import geopandas as gpd
+
+    from bench import best_time
+
+    # Scattermapbox is deprecated in newer plotly releases
+    warnings.simplefilter('ignore', DeprecationWarning)
+
+    parser = argparse.ArgumentParser(description="Benchmark the map layer builders")
+    parser.add_argument("paths", nargs="+", help="line or point layer files")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for path in args.paths:
+        gdf = gpd.read_file(path)
+        gdf = gdf[gdf.geometry.notna()].to_crs("EPSG:4326")
+        n_vertices = int(shapely.get_num_coordinates(_geometry_array(gdf)).sum())
+        print(f"{path}: {len(gdf)} features, {n_vertices} vertices")
+
+        if gdf.geom_type.isin(['Point', 'MultiPoint']).all():
+            ms = best_time(lambda: point_layer_trace(gdf, 'Point', 'red', 'points'), args.repeat)
+            print(f"  point_layer_trace            {ms:8.1f} ms")
+        else:
+            ms = best_time(lambda: gap_separated(*line_coordinates(gdf)[::2]), args.repeat)
+            print(f"  line_coordinates + gaps      {ms:8.1f} ms")
+            ms = best_time(lambda: line_layer_traces(gdf, 'Line', 'blue', 'lines'), args.repeat)
+            print(f"  line_layer_traces (merged)   {ms:8.1f} ms")
+            ms = best_time(lambda: line_layer_traces(gdf, 'Line', 'blue', 'lines', merged=False), args.repeat)
+            print(f"  line_layer_traces (per part) {ms:8.1f} ms")
+            before, after = (
+                traces_json_size(line_layer_traces(gdf, 'Line', 'blue', 'lines', precision=precision))
+                for precision in (None, COORD_PRECISION)
+            )
+            print(f"  {compaction_report(before, after, COORD_PRECISION)}")
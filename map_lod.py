@@ -0,0 +1,44 @@
+import math
+
+from reproject import to_crs_batch
+
+# Simplification tolerances of the detail levels, in metres (0 = full detail)
+LOD_TOLERANCES = [0, 2, 5, 10, 20, 50]
+
+# Earth circumference at the equator, in metres
+EARTH_CIRCUMFERENCE = 40075016.686
+
+# Mapbox renders 512 px tiles (Leaflet: 256 px)
+TILE_SIZE = 512
+
+
+def simplify_pyramid(copies, tolerances=LOD_TOLERANCES):
+    """Simplify a line/polygon layer at every tolerance for display.
+
+    copies is the layer's reproject.LayerCopies: simplification runs on the
+    projected copy so the tolerances are metres, then all simplified levels
+    are reprojected to the geographic CRS in one batched call. The full
+    detail level is the geographic copy itself. Returns {tolerance:
+    GeoDataFrame}.
+    """
+    projected = copies.projected
+    simplified = [
+        projected.set_geometry(projected.geometry.simplify(tolerance, preserve_topology=True))
+        for tolerance in tolerances if tolerance > 0
+    ]
+    levels = iter(to_crs_batch(simplified, copies.geographic.crs))
+    return {
+        tolerance: copies.geographic if tolerance == 0 else next(levels)
+        for tolerance in tolerances
+    }
+
+
+def metres_per_pixel(zoom, lat, tile_size=TILE_SIZE):
+    """Ground size of one screen pixel of a web map at zoom and latitude"""
+    return EARTH_CIRCUMFERENCE * math.cos(math.radians(lat)) / (tile_size * 2 ** zoom)
+
+
+def tolerance_for_view(zoom, lat, tolerances=LOD_TOLERANCES, tile_size=TILE_SIZE):
+    """Pick the coarsest tolerance that stays below one pixel in the view"""
+    pixel = metres_per_pixel(zoom, lat, tile_size)
+    return max(tolerance for tolerance in tolerances if tolerance <= pixel)
@@ -0,0 +1,536 @@
+import json
+import traceback
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import shapely
+import streamlit as st
+
+from catalog import get_catalog
+from dataset_cache import cached_dataset
+from figure_cache import figure_key, read_figure, read_meta, read_report, write_figure
+from geoparquet import read_layer
+
+from map_layers import (
+    COORD_PRECISION,
+    LAYER_TITLES,
+    animation_controls,
+    compaction_report,
+    legend_trace,
+    line_layer_traces,
+    payload_report,
+    point_layer_trace,
+    traces_json_size,
+    year_frames
+)
+from map_lod import simplify_pyramid, tolerance_for_view
+from partitions import load_partition_index, partition_bounds, partition_years, read_year, union_bounds
+from reproject import layer_copies
+from spatial_index import LayerIndex, SiteIndex
+
+# Year selection modes for the map panels
+YEAR_MODES = ["Auto", "Animation", "Year slider"]
+
+# In "Auto" mode, archives longer than this are served one year at a time
+ANIMATION_MAX_YEARS = 10
+
+# How the map panels are drawn: Plotly figures holding every feature (with
+# year animation), or Leaflet maps sent only the features in view
+MAP_RENDERERS = ["Plotly (all features)", "Leaflet (viewport)"]
+
+# Detail options for the shoreline/transect geometries
+MAP_DETAILS = ["Auto", "Full resolution"]
+
+# Coordinate precision options of the map panels (None = uncompacted)
+MAP_PRECISIONS = {
+    f"{COORD_PRECISION} decimals (~1 m)": COORD_PRECISION,
+    "6 decimals (~10 cm)": 6,
+    "Full (uncompacted)": None
+}
+
+# Initial zoom of the map panels
+MAP_ZOOM = 13
+
+# Layers drawn from the simplified level-of-detail pyramid
+LOD_LAYERS = ('shorelines', 'transects')
+
+# Possible year field names of each layer
+YEAR_FIELDS = {
+    'shorelines': ['year', 'Year', 'YEAR', 'date', 'Date'],
+    'change_polygons': ['end_year', 'endYear', 'year', 'Year', 'YEAR'],
+    'intersections': ['end_year', 'endYear', 'year', 'Year', 'YEAR']
+}
+
+# Attribute columns shown in each layer's hover labels (besides its year
+# field); layers are read with only these columns
+HOVER_FIELDS = {
+    'shorelines': ['date', 'satellite'],
+    'change_polygons': ['transect', 'start_year', 'change_m', 'change_typ'],
+    'intersections': ['transect', 'date', 'distance', 'satellite'],
+    'transects': ['name', 'length_m', 'leng']
+}
+
+# Per-year layers, in drawing order (bottom to top)
+YEAR_LAYERS = ('change_polygons', 'shorelines', 'intersections')
+
+# Layers switched on when a map panel is first shown
+DEFAULT_LAYERS = ('shorelines', 'transects', 'intersections')
+
+LAYER_NAMES = {
+    'shorelines': 'Shorelines',
+    'change_polygons': 'Change Polygons',
+    'intersections': 'Intersections',
+    'transects': 'Transects'
+}
+
+
+def layer_columns(name):
+    """Attribute columns a map layer is read with: hover fields and year fields"""
+    return tuple(dict.fromkeys(HOVER_FIELDS.get(name, []) + YEAR_FIELDS.get(name, [])))
+
+
+@cached_dataset
+def load_layer_copies(path, columns=None, partition=None):
+    """Load a layer once, keeping its projected and geographic (WGS84) copies.
+
+    partition = (content hash, year field, year) reads only that year from
+    the layer's year partitions (see partitions.py).
+    """
+    if partition is None:
+        return layer_copies(read_layer(path, crs=None, columns=columns))
+    digest, year_field, year = partition
+    return layer_copies(read_year(load_partition_index(path, digest, year_field), year, columns))
+
+
+def load_layer(path, columns=None, partition=None):
+    """Return the WGS84 copy of a layer, for display"""
+    return load_layer_copies(path, columns, partition).geographic
+
+
+@cached_dataset
+def load_layer_pyramid(path, columns=None, partition=None):
+    """Precompute the simplified detail levels of a line layer"""
+    return simplify_pyramid(load_layer_copies(path, columns, partition))
+
+
+@cached_dataset
+def load_layer_index(path, columns=None, partition=None):
+    """Spatial index (STRtree) of a layer, built once per loaded layer"""
+    return LayerIndex(load_layer_copies(path, columns, partition))
+
+
+def load_site_index(paths):
+    """SiteIndex over the layers of a site's map panel: paths maps layer
+    names to their catalogued files, as given to render_map_panel (None
+    skipped)"""
+    catalog = get_catalog()
+    return SiteIndex({
+        name: load_layer_index(str(catalog.source(path)), layer_columns(name))
+        for name, path in paths.items()
+        if path is not None
+    })
+
+
+def selected_layers(method, site, paths):
+    """Layer picker of a map panel; returns the names of the layers switched on"""
+    return st.multiselect(
+        "**Layers:**",
+        options=list(paths),
+        default=[name for name in DEFAULT_LAYERS if name in paths],
+        format_func=LAYER_NAMES.get,
+        key=f"map_layers_{method}_{site}"
+    )
+
+
+def map_tolerance(pyramid):
+    """Return the simplification tolerance (m) to draw for the current view"""
+    if st.session_state.get('map_detail', 'Auto') == 'Full resolution':
+        return 0
+    bounds = pyramid[0].total_bounds
+    return tolerance_for_view(MAP_ZOOM, (bounds[1] + bounds[3]) / 2)
+
+
+def map_precision():
+    """Return the coordinate precision selected in the sidebar"""
+    return MAP_PRECISIONS[st.session_state.get('map_precision', next(iter(MAP_PRECISIONS)))]
+
+
+def find_year_field(fields, possible_names):
+    """Return the first of possible_names that is in fields"""
+    for name in possible_names:
+        if name in fields:
+            return name
+    return None
+
+
+def use_animation(n_years):
+    """Return True if the per-year layers should be sent as animation frames"""
+    mode = st.session_state.get('map_year_mode', 'Auto')
+    if mode == 'Animation':
+        return True
+    if mode == 'Year slider':
+        return False
+    return n_years <= ANIMATION_MAX_YEARS
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_year_traces(cache_key, year, _year_traces):
+    """Build the per-year traces once per figure (sources and settings) and year"""
+    return [trace.to_plotly_json() for trace in _year_traces(year)]
+
+
+def year_slider(years, method, site):
+    """Server-side year picker used when the years are not animated"""
+    return st.select_slider(
+        "**Year:**",
+        options=list(years),
+        value=years[-1],
+        key=f"year_slider_{method}_{site}"
+    )
+
+
+def add_year_layers(fig, years, year_traces, site, method, cache_key, year=None):
+    """Add the per-year traces to fig after its static traces.
+
+    With year=None every year goes to the browser as a delta-only animation
+    frame. Otherwise only the given year's traces (picked on the server with
+    year_slider) are sent, built through cached_year_traces under
+    cache_key. Returns the years sent to the browser.
+    """
+    if year is None:
+        frames = year_frames(years, year_traces, first_trace=len(fig.data))
+        fig.add_traces(frames[-1].data)
+        fig.frames = frames
+        fig.update_layout(**animation_controls(years))
+        return list(years)
+    else:
+        fig.add_traces(cached_year_traces(cache_key, year, year_traces))
+        # Keep the user's zoom/pan when the year changes
+        fig.update_layout(uirevision=f"{method}/{site}")
+        return [year]
+
+
+def static_layer_traces(layers, style, precision=COORD_PRECISION):
+    """Build the traces of the layers that are the same for every year"""
+    if 'transects' not in layers:
+        return []
+    return line_layer_traces(
+        layers['transects'], LAYER_TITLES['transects'] + style.get('suffix', ''),
+        style['colors']['transects'], 'transects', width=style.get('width', 2),
+        precision=precision
+    )
+
+
+def year_layer_traces(layers, year_fields, style, year, precision=COORD_PRECISION):
+    """Build the traces of the per-year layers of one year"""
+    traces = []
+    for name in YEAR_LAYERS:
+        if name not in layers:
+            continue
+        gdf = layers[name]
+        gdf = gdf[gdf[year_fields[name]] == year]
+        title = LAYER_TITLES[name] + style.get('suffix', '')
+        color = style['colors'][name]
+        if name == 'intersections':
+            traces.append(point_layer_trace(gdf, title, color, name, precision=precision))
+            continue
+        if name == 'change_polygons':
+            # Change polygons are drawn as outlines
+            gdf = gdf.set_geometry(gdf.boundary)
+        traces.extend(line_layer_traces(
+            gdf, title, color, name, width=style.get('width', 2), precision=precision
+        ))
+    return traces
+
+
+def layer_payload_sizes(layers, year_fields, years, style, precision):
+    """Return the trace bytes of the given years without and with compaction"""
+    return tuple(
+        traces_json_size(static_layer_traces(layers, style, p) + [
+            trace for year in years
+            for trace in year_layer_traces(layers, year_fields, style, year, p)
+        ])
+        for p in (None, precision)
+    )
+
+
+def build_map_figure(layers, year_fields, years, style, site, method, cache_key,
+                     precision=COORD_PRECISION, year=None, bounds=None):
+    """Build the shoreline map of one method from its loaded layers.
+
+    cache_key identifies the sources and settings of the figure (see
+    figure_cache.figure_key). year=None animates all years, otherwise only
+    that year is drawn. bounds (WGS84) centre the map; by default they
+    are the extent of the layers.
+    Returns the figure, its static traces and the years sent to the browser.
+    """
+    legend_suffix = style.get('legend_suffix', '')
+    colors = style['colors']
+    width = style.get('width', 2)
+
+    # Calculate initial center
+    if bounds is None:
+        bounds = pd.concat([gdf.geometry for gdf in layers.values()]).total_bounds
+    center_lon = (bounds[0] + bounds[2]) / 2
+    center_lat = (bounds[1] + bounds[3]) / 2
+
+    fig = go.Figure()
+
+    # Legend entries (the drawn traces themselves stay out of the legend)
+    for name in ('transects',) + YEAR_LAYERS:
+        if name in layers:
+            fig.add_trace(legend_trace(
+                LAYER_NAMES[name] + legend_suffix,
+                colors[name],
+                name,
+                center_lon,
+                center_lat,
+                mode='markers' if name == 'intersections' else 'lines',
+                width=width
+            ))
+
+    # Transects are the same for every year, so they are drawn once
+    fig.add_traces(static_layer_traces(layers, style, precision))
+
+    static_traces = list(fig.data)
+
+    def year_traces(year):
+        return year_layer_traces(layers, year_fields, style, year, precision)
+
+    # Add per-year layers (animation frames or one server-selected year)
+    sent_years = []
+    if years:
+        sent_years = add_year_layers(
+            fig, years, year_traces, site, method, cache_key, year
+        )
+
+    # Update layout with white background
+    fig.update_layout(
+        mapbox=dict(
+            style="open-street-map",
+            center=dict(lon=center_lon, lat=center_lat),
+            zoom=MAP_ZOOM
+        ),
+        height=600,
+        margin=dict(l=0, r=0, t=style.get('margin_top', 0), b=0),
+        showlegend=True,
+        paper_bgcolor='#ffffff',
+        plot_bgcolor='#ffffff',
+        font=dict(color='#000000', size=12),
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01,
+            bgcolor="rgba(255, 255, 255, 0.95)",
+            font=dict(color="#000000", size=12),
+            bordercolor="#d0d5dd",
+            borderwidth=2
+        )
+    )
+
+    return fig, static_traces, sent_years
+
+
+MAP_CHART_CONFIG = {
+    'scrollZoom': True,
+    'displayModeBar': True,
+    'displaylogo': False,
+    'modeBarButtonsToRemove': ['lasso2d', 'select2d']
+}
+
+
+def render_cached_map(key, meta, method, site):
+    """Draw a map panel from the figure cache; returns False on a cache miss"""
+    year = None if meta['animated'] or not meta['years'] else year_slider(meta['years'], method, site)
+    figure_json = read_figure(key, year)
+    if figure_json is None:
+        return False
+    # Figures built without the payload report are rebuilt to show it
+    report = read_report(key, year) if st.session_state.get('show_map_payload') else None
+    if st.session_state.get('show_map_payload') and report is None:
+        return False
+
+    st.plotly_chart(json.loads(figure_json), use_container_width=True, config=MAP_CHART_CONFIG)
+    if report is not None:
+        for line in report:
+            st.caption(line)
+        st.caption(
+            f"Figure JSON: {len(figure_json) / 1024:,.0f} KB served from the figure cache "
+            f"(built {meta.get('created', '?')})"
+        )
+    return True
+
+
+def render_map_panel(method, site, paths, style, folder_tree):
+    """Render the animated shoreline map shared by the four map panels.
+
+    paths maps layer names (shorelines, transects, intersections,
+    change_polygons) to their shapefiles as found in the dataset catalog
+    (None when missing), style is the method's entry of
+    MAP_STYLES and folder_tree the expected layout shown when files are missing.
+    Only the layers switched on in the panel's layer picker are read, and
+    built figures are kept in the on-disk figure cache (see figure_cache.py).
+    """
+    names = selected_layers(method, site, paths)
+    if not names:
+        st.info("Select at least one layer to draw the map.")
+        return
+
+    if any(paths[name] is None for name in names):
+        missing = "\n".join(
+            f"        - {LAYER_NAMES[name]}: {'✓' if path is not None else '❌'}"
+            for name, path in paths.items()
+        )
+        st.warning(f"""
+        ⚠️ **Shapefiles not found!**
+
+        Please create the following folder structure and add your shapefiles:
+
+        ```
+{folder_tree}
+        ```
+
+        Missing files:
+{missing}
+        """)
+        return
+
+    try:
+        precision = map_precision()
+        catalog = get_catalog()
+        sources = [paths[name] for name in names]
+        hashes = catalog.file_hashes(sources)
+        key = figure_key(sources, {
+            'method': method,
+            'site': site,
+            'layers': names,
+            'style': style,
+            'detail': st.session_state.get('map_detail', 'Auto'),
+            'year_mode': st.session_state.get('map_year_mode', 'Auto'),
+            'animation_max_years': ANIMATION_MAX_YEARS,
+            'precision': precision,
+            'zoom': MAP_ZOOM
+        }, hashes)
+
+        # Year field names, from the fields recorded in the catalog
+        year_fields = {
+            name: find_year_field(catalog.entry_for(paths[name])['fields'], YEAR_FIELDS[name])
+            for name in names
+            if name in YEAR_FIELDS
+        }
+
+        if not all(year_fields.values()):
+            expected = "\n".join(
+                f"                - {LAYER_NAMES[name]}: " + ", ".join(f"'{field}'" for field in YEAR_FIELDS[name])
+                for name in year_fields
+            )
+            st.error(f"""
+                ❌ **Cannot find year fields in shapefiles!**
+
+                Expected fields:
+{expected}
+                """)
+            return
+
+        if st.session_state.get('map_renderer', MAP_RENDERERS[0]) == 'Leaflet (viewport)':
+            from viewport_map import render_viewport_map
+
+            render_viewport_map(method, site, paths, names, year_fields, style)
+            return
+
+        # A cached figure is served without reading the shapefiles at all
+        meta = read_meta(key)
+        if meta is not None and render_cached_map(key, meta, method, site):
+            return
+
+        # Copies of the same dataset (e.g. CoastSat and Coastsat) load from
+        # one source file, so they share one cached layer
+        sources = {name: str(catalog.source(paths[name])) for name in names}
+
+        # The per-year layers are split into year partitions once; their
+        # index gives the years without reading the layers
+        indexes = {
+            name: load_partition_index(sources[name], catalog.entry_for(paths[name])['hash'], field)
+            for name, field in year_fields.items()
+        }
+        years = sorted(set().union(*(partition_years(index) for index in indexes.values())))
+
+        if year_fields and len(years) == 0:
+            st.warning("⚠️ No valid years found in the data.")
+            return
+
+        # Animate all years in the browser or pick one on the server
+        animated = use_animation(len(years))
+        year = None
+        if years and not animated:
+            if meta is not None:
+                # The cache lookup already drew the slider
+                year = st.session_state[f"year_slider_{method}_{site}"]
+            else:
+                year = year_slider(years, method, site)
+
+        # A single year is read from its partitions alone
+        partitions = {
+            name: (index['hash'], index['year_field'], year) if year is not None else None
+            for name, index in indexes.items()
+        }
+
+        layers = {
+            name: load_layer(sources[name], layer_columns(name), partitions.get(name))
+            for name in names
+            if name not in LOD_LAYERS
+        }
+
+        # Shorelines and transects come from the detail level matching the view
+        pyramids = {
+            name: load_layer_pyramid(sources[name], layer_columns(name), partitions.get(name))
+            for name in names
+            if name in LOD_LAYERS
+        }
+        tolerance = map_tolerance(next(iter(pyramids.values()))) if pyramids else 0
+        for name, pyramid in pyramids.items():
+            layers[name] = pyramid[tolerance]
+
+        # Centre the map on all years, not on the one drawn
+        bounds = None
+        if year is not None:
+            bounds = union_bounds([partition_bounds(index) for index in indexes.values()] + [
+                layers[name].total_bounds for name in layers if name not in indexes
+            ])
+
+        fig, static_traces, sent_years = build_map_figure(
+            layers, year_fields, years, style, site, method, key, precision, year, bounds
+        )
+
+        # Render the chart
+        st.plotly_chart(fig, use_container_width=True, config=MAP_CHART_CONFIG)
+
+        # The payload report is stored with the figure, for cache hits to show
+        report = None
+        if st.session_state.get('show_map_payload'):
+            sizes = payload_report(fig, static_traces)
+            for name, pyramid in pyramids.items():
+                full, drawn = (
+                    shapely.get_num_coordinates(pyramid[level].geometry.values).sum()
+                    for level in (0, tolerance)
+                )
+                sizes += f" · {name}: {drawn:,} of {full:,} vertices"
+            before, after = layer_payload_sizes(layers, year_fields, sent_years, style, precision)
+            report = [sizes + f" ({tolerance} m detail)", compaction_report(before, after, precision)]
+            for line in report:
+                st.caption(line)
+
+        write_figure(key, pio.to_json(fig, validate=False), {
+            'method': method,
+            'site': site,
+            'years': years,
+            'animated': animated,
+            'sources': hashes
+        }, year, report)
+
+    except Exception as e:
+        st.error(f"❌ Error loading shapefiles: {str(e)}")
+        with st.expander("Show detailed error"):
+            st.code(traceback.format_exc())
@@ -0,0 +1,154 @@
+import json
+import math
+import os
+from pathlib import Path
+
+from dataset_cache import cached_dataset
+
+# Year partitions of the per-year layers, one folder per dataset content
+# hash and year field: <hash>-<field>/year=<year>.parquet plus index.json
+PARTITION_DIR = Path(".cache/partitions")
+
+# Bump when the partitions change shape so older ones are rewritten
+PARTITION_VERSION = 2
+
+# Partition with the layer's columns and no features, read for the years
+# a layer lacks
+EMPTY_PARTITION = "empty.parquet"
+
+
+def partition_dir(digest, year_field):
+    """Folder of the year partitions of a dataset (by content hash)"""
+    return PARTITION_DIR / f"{digest}-{year_field}"
+
+
+def write_partitions(path, digest, year_field):
+    """Split a layer into one GeoParquet file per year; returns the index.
+
+    The index lists every year with its file, feature count and bounds
+    (WGS84). Features without a year are left out, as the map
+    panels never draw them; a layer without any has no years, only the
+    empty partition. index.json is written last, so a folder with an
+    index is complete.
+    """
+    from data_sources import temporary_path
+    from geoparquet import read_layer
+    from reproject import GEOGRAPHIC_CRS, transformer
+
+    gdf = read_layer(path, crs=None)
+    to_geographic = transformer(gdf.crs, GEOGRAPHIC_CRS)
+    directory = partition_dir(digest, year_field)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    def write(part, file):
+        tmp = temporary_path(file)
+        part.to_parquet(tmp, index=False, write_covering_bbox=True)
+        os.replace(tmp, file)
+
+    write(gdf.iloc[:0], directory / EMPTY_PARTITION)
+    years = {}
+    for year, part in gdf.groupby(year_field, sort=True):
+        file = directory / f"year={int(year)}.parquet"
+        write(part, file)
+        years[str(int(year))] = {
+            'file': file.name,
+            'features': len(part),
+            'bounds': list(to_geographic.transform_bounds(*part.total_bounds))
+        }
+
+    index = {
+        'version': PARTITION_VERSION,
+        'hash': digest,
+        'year_field': year_field,
+        'years': years
+    }
+    tmp = temporary_path(directory / "index.json")
+    tmp.write_text(json.dumps(index), encoding='utf-8')
+    os.replace(tmp, directory / "index.json")
+    return index
+
+
+def read_partition_index(digest, year_field):
+    """Return the index of a dataset's year partitions, or None if there is none"""
+    try:
+        index = json.loads((partition_dir(digest, year_field) / "index.json").read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    return index if index.get('version') == PARTITION_VERSION else None
+
+
+@cached_dataset
+def load_partition_index(path, digest, year_field):
+    """Index of the year partitions of the layer at path, written on first use"""
+    return read_partition_index(digest, year_field) or write_partitions(path, digest, year_field)
+
+
+def partition_years(index):
+    """Years of a partition index, in order"""
+    return sorted(int(year) for year in index['years'])
+
+
+def union_bounds(boxes):
+    """Bounds (minx, miny, maxx, maxy) covering all of boxes, or None if
+    there are none; empty boxes (None, or NaN as total_bounds gives for no
+    features) are skipped"""
+    boxes = [box for box in boxes if box is not None and not any(math.isnan(side) for side in box)]
+    if not boxes:
+        return None
+    return [
+        min(box[0] for box in boxes), min(box[1] for box in boxes),
+        max(box[2] for box in boxes), max(box[3] for box in boxes)
+    ]
+
+
+def partition_bounds(index):
+    """WGS84 bounds of all years of a partition index (None if it has none)"""
+    return union_bounds(entry['bounds'] for entry in index['years'].values())
+
+
+def read_year(index, year, columns=None):
+    """Read one year of a partitioned layer (empty if the layer has no such year)"""
+    from geoparquet import read_geoparquet
+
+    entry = index['years'].get(str(int(year)))
+    # Same columns, no features
+    file = entry['file'] if entry is not None else EMPTY_PARTITION
+    return read_geoparquet(partition_dir(index['hash'], index['year_field']) / file, columns)
+
+
+def prune(catalog):
+    """Delete the partitions of datasets no longer in the catalog; returns how many"""
+    import shutil
+
+    hashes = {entry['hash'] for entry in catalog.datasets}
+    removed = 0
+    for directory in PARTITION_DIR.glob("*"):
+        if directory.name.rsplit('-', 1)[0] not in hashes:
+            shutil.rmtree(directory)
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    # Write the year partitions of every catalogued layer with a year field:
+    #   python partitions.py [data] [--prune]
+    import argparse
+
+    from catalog import DATA_ROOT, load_catalog
+
+    parser = argparse.ArgumentParser(description="Partition the per-year layers by year")
+    parser.add_argument("root", nargs="?", default=DATA_ROOT)
+    parser.add_argument("--prune", action="store_true", help="remove partitions of datasets no longer catalogued")
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.root)
+    done = set()
+    for entry in catalog.datasets:
+        key = (entry['hash'], entry['year_field'])
+        if entry['kind'] != 'shapefile' or entry['year_field'] is None or key in done:
+            continue
+        done.add(key)
+        index = read_partition_index(*key) or write_partitions(catalog.source(entry['path']), *key)
+        print(f"{entry['path']:<70} {len(index['years']):3d} years -> {partition_dir(*key)}")
+    if args.prune:
+        print(f"Removed {prune(catalog)} partition folder(s) from {PARTITION_DIR}")
@@ -0,0 +1,67 @@
+import functools
+from collections import namedtuple
+
+import numpy as np
+import pyproj
+import shapely
+
+# CRS the map panels draw in
+GEOGRAPHIC_CRS = "EPSG:4326"
+
+# A layer in a metric CRS (for lengths/distances) and in GEOGRAPHIC_CRS (for display)
+LayerCopies = namedtuple('LayerCopies', ['projected', 'geographic'])
+
+
+@functools.lru_cache(maxsize=32)
+def transformer(src, dst):
+    """Return the pyproj Transformer of a (source, destination) CRS pair, built once"""
+    return pyproj.Transformer.from_crs(src, dst, always_xy=True)
+
+
+def to_crs_batch(gdfs, crs):
+    """Reproject several GeoDataFrames to crs.
+
+    The geometries of all frames sharing a source CRS go through a single
+    shapely.transform call with that pair's cached transformer. Frames
+    already in crs are returned as they are.
+    """
+    from geopandas import GeoSeries
+
+    crs = pyproj.CRS.from_user_input(crs)
+    groups = {}
+    for i, gdf in enumerate(gdfs):
+        if gdf.crs is None:
+            raise ValueError("Cannot reproject a layer without a CRS")
+        if gdf.crs != crs:
+            groups.setdefault(gdf.crs, []).append(i)
+
+    out = list(gdfs)
+    for src, indices in groups.items():
+        geoms = [np.asarray(gdfs[i].geometry.values, dtype=object) for i in indices]
+        t = transformer(src, crs)
+        moved = shapely.transform(
+            np.concatenate(geoms),
+            lambda xy: np.column_stack(t.transform(xy[:, 0], xy[:, 1]))
+        )
+        parts = np.split(moved, np.cumsum([len(part) for part in geoms])[:-1])
+        for i, part in zip(indices, parts):
+            gdf = gdfs[i]
+            out[i] = gdf.set_geometry(
+                GeoSeries(part, index=gdf.index, crs=crs, name=gdf.geometry.name)
+            )
+    return out
+
+
+def projected_crs(gdf):
+    """The layer's own CRS if it is projected, otherwise its UTM zone"""
+    return gdf.crs if gdf.crs.is_projected else gdf.estimate_utm_crs()
+
+
+def layer_copies(gdf):
+    """Return the LayerCopies of a layer, reprojecting it once"""
+    geographic, = to_crs_batch([gdf], GEOGRAPHIC_CRS)
+    projected = gdf
+    # An empty layer has no extent to pick a UTM zone from
+    if not gdf.crs.is_projected and len(gdf):
+        projected, = to_crs_batch([geographic], projected_crs(geographic))
+    return LayerCopies(projected, geographic)
@@ -0,0 +1,391 @@
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_sources import temporary_path
+from dataset_cache import cached_dataset
+from timeseries import DISTANCE_SUFFIX, csv_columns, narrow_years, parse_dates_column, time_series_dtypes
+from transect_statistics import DAYS_PER_YEAR, REFERENCES, statistics_frame
+
+# Running statistics of the time series CSVs, one file per CSV and reference
+RUNNING_DIR = Path(".cache/running")
+
+# Bump when the state changes shape so older states are rebuilt
+RUNNING_VERSION = 3
+
+# Per-transect sums and extremes. Distances are summed less the transect's
+# first distance (shift) so the sums of squares keep their precision
+SUM_FIELDS = ('sum_t', 'sum_y', 'sum_tt', 'sum_ty', 'sum_yy')
+
+# Growth of the observations since the median reference positions were
+# taken after which they are taken again from the whole series
+REBASE_GROWTH = 1.25
+
+
+def _empty_state(count):
+    return {
+        'n': np.zeros(count, dtype='int64'),
+        'shift': np.zeros(count),
+        **{field: np.zeros(count) for field in SUM_FIELDS},
+        'min_y': np.full(count, np.inf),
+        'max_y': np.full(count, -np.inf),
+        'first_t': np.full(count, np.inf),
+        'first_y': np.full(count, np.nan),
+        'last_t': np.full(count, -np.inf),
+        'last_y': np.full(count, np.nan),
+        'position': np.full(count, np.nan)
+    }
+
+
+class RunningStatistics:
+    """Sufficient statistics of every transect of a wide time series CSV.
+
+    Per transect: the observation count, the sums of t, y, t^2, t*y and y^2
+    (t in years, y the distance), the extreme distances and the earliest and
+    latest observations. update() folds new rows in with O(rows) work and
+    statistics() turns the sums into the compute_statistics columns, so new
+    scenes never mean a pass over the whole series.
+
+    The median reference position is the one statistic sums cannot give.
+    With reference='median' it is taken from the whole series by rebase()
+    and then held fixed while scenes are appended, until the observations
+    outgrow REBASE_GROWTH times those it was taken from (see stale()).
+    In between, change is measured from that earlier median; only the
+    statistics relative to the reference (mean change, max erosion and
+    accretion) depend on it.
+    """
+
+    def __init__(self, header, reference='median', state=None, consumed=0, prefix=None, origin=None, rebased=0):
+        if reference not in REFERENCES:
+            raise ValueError(f"Unknown reference position: {reference!r}")
+        self.header = list(header)
+        self.transects = [col[:-len(DISTANCE_SUFFIX)] for col in self.header if col.endswith(DISTANCE_SUFFIX)]
+        self.reference = reference
+        self.state = state or _empty_state(len(self.transects))
+        # Bytes of the CSV read so far, and their SHA-1
+        self.consumed = consumed
+        self.prefix = prefix
+        # Date t is counted from (ISO 8601), set by the first rows with dates
+        self.origin = origin
+        # Observations the median reference positions were taken from
+        self.rebased = rebased
+
+    def __len__(self):
+        return int(self.state['n'].sum())
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.state.values())
+
+    def _distances(self, rows):
+        return rows[[f"{name}{DISTANCE_SUFFIX}" for name in self.transects]]
+
+    def _times(self, rows):
+        """Time of every row, in years (since origin when the rows have dates)"""
+        if 'dates' not in rows.columns:
+            return rows['year'].to_numpy(dtype='float64', na_value=np.nan)
+        if self.origin is None:
+            self.origin = rows['dates'].min().isoformat()
+        elapsed = pd.DatetimeIndex(rows['dates']) - pd.Timestamp(self.origin)
+        return np.asarray(elapsed / pd.Timedelta(days=DAYS_PER_YEAR), dtype='float64')
+
+    def update(self, rows):
+        """Fold new rows of the wide time series (parsed like load_time_series) in"""
+        if len(rows) == 0:
+            return
+        values = self._distances(rows).to_numpy(dtype='float32').T.astype('float64')
+        t = self._times(rows)
+        present = ~np.isnan(values)
+        count = present.sum(axis=1)
+        everyone = np.arange(len(values))
+        s = self.state
+
+        started = (s['n'] == 0) & (count > 0)
+        s['shift'] = np.where(started, values[everyone, present.argmax(axis=1)], s['shift'])
+        y = np.where(present, values - s['shift'][:, None], 0)
+        dt = np.where(present, t, 0)
+        s['n'] = s['n'] + count
+        s['sum_t'] = s['sum_t'] + dt.sum(axis=1)
+        s['sum_y'] = s['sum_y'] + y.sum(axis=1)
+        s['sum_tt'] = s['sum_tt'] + (dt * dt).sum(axis=1)
+        s['sum_ty'] = s['sum_ty'] + (dt * y).sum(axis=1)
+        s['sum_yy'] = s['sum_yy'] + (y * y).sum(axis=1)
+        s['min_y'] = np.minimum(s['min_y'], np.where(present, values, np.inf).min(axis=1))
+        s['max_y'] = np.maximum(s['max_y'], np.where(present, values, -np.inf).max(axis=1))
+
+        # Earliest and latest observations; on equal times the one read first
+        # is first and the one read last is last, as in file order
+        earliest = np.where(present, t, np.inf)
+        i = earliest.argmin(axis=1)
+        earlier = earliest[everyone, i] < s['first_t']
+        s['first_t'] = np.where(earlier, earliest[everyone, i], s['first_t'])
+        s['first_y'] = np.where(earlier, values[everyone, i], s['first_y'])
+        latest = np.where(present, t, -np.inf)
+        j = latest.shape[1] - 1 - latest[:, ::-1].argmax(axis=1)
+        later = (count > 0) & (latest[everyone, j] >= s['last_t'])
+        s['last_t'] = np.where(later, latest[everyone, j], s['last_t'])
+        s['last_y'] = np.where(later, values[everyone, j], s['last_y'])
+
+    def rebase(self, rows):
+        """Take the median reference positions from rows, every row folded in so far"""
+        self.rebased = len(self)
+        if self.reference == 'median' and len(rows):
+            self.state['position'] = self._distances(rows).astype('float32').median().to_numpy(dtype='float64')
+
+    def stale(self):
+        """Whether the median reference positions are due to be taken again
+        (too many observations since, or transects observed since)"""
+        if self.reference != 'median':
+            return False
+        s = self.state
+        return len(self) > REBASE_GROWTH * self.rebased or bool(np.any((s['n'] > 0) & np.isnan(s['position'])))
+
+    def covered_by(self, stats):
+        """Whether a transect_statistics table counts every observation seen here"""
+        points = dict(zip(stats['Transect'].astype(str), stats['N_Points']))
+        return all(n <= points.get(name, -1) for name, n in zip(self.transects, self.state['n']) if n > 0)
+
+    def statistics(self, sign=1, ddof=0, net='endpoints', undefined=None):
+        """The compute_statistics columns of every transect, from the sums alone"""
+        s = self.state
+        counts = s['n']
+        present = counts > 0
+        n = counts[present]
+        sums = {field: s[field][present] for field in s}
+
+        if self.reference == 'median':
+            position = sums['position']
+        elif self.reference == 'first':
+            position = sums['first_y']
+        else:
+            position = np.zeros(len(n))
+
+        sxx = sums['sum_tt'] - sums['sum_t'] ** 2 / n
+        sxy = sums['sum_ty'] - sums['sum_t'] * sums['sum_y'] / n
+        syy = np.maximum(sums['sum_yy'] - sums['sum_y'] ** 2 / n, 0)
+        low = sign * (sums['min_y'] - position)
+        high = sign * (sums['max_y'] - position)
+        span = sums['last_t'] - sums['first_t']
+        if net == 'range':
+            net = sign * (sums['min_y'] - sums['max_y'])
+        else:
+            net = sign * (sums['last_y'] - sums['first_y'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            epr = np.where(span > 0, net / span, np.nan)
+            std = np.where(n > ddof, np.sqrt(syy / (n - ddof)), np.nan)
+            lrr = np.where(sxx > 0, sign * sxy / sxx, np.nan)
+            lr2 = np.where(sxx * syy > 0, sxy * sxy / (sxx * syy), np.nan)
+
+        values = {
+            'Mean_Change_m': sign * (sums['shift'] + sums['sum_y'] / n - position),
+            'Std_Dev_m': std,
+            'Max_Erosion_m': np.minimum(low, high),
+            'Max_Accretion_m': np.maximum(low, high),
+            'Net_Change_m': net,
+            'Rate_m_per_year': epr,
+            'EPR_m_per_year': epr,
+            'LRR_m_per_year': lrr,
+            'LR2': lr2,
+            'WLR_m_per_year': lrr,
+            'SCE_m': sums['max_y'] - sums['min_y']
+        }
+        return statistics_frame(self.transects, counts, values, undefined)
+
+
+def _state_path(path, reference):
+    """Saved state of a CSV, named after its absolute path"""
+    digest = hashlib.sha1(os.path.realpath(path).encode()).hexdigest()[:16]
+    return RUNNING_DIR / f"{Path(path).stem}-{digest}-{reference}.npz"
+
+
+def _hash_bytes(digest, path, start, end):
+    """Update a hashlib digest with bytes start:end of a file, a block at a time; returns it"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest
+
+
+def save_state(running, path):
+    """Write a RunningStatistics to path atomically"""
+    meta = {
+        'version': RUNNING_VERSION,
+        'header': running.header,
+        'reference': running.reference,
+        'consumed': running.consumed,
+        'prefix': running.prefix,
+        'origin': running.origin,
+        'rebased': running.rebased
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # np.savez adds .npz to names without it
+    tmp = temporary_path(path, '.tmp.npz')
+    np.savez(tmp, meta=np.array(json.dumps(meta)), **running.state)
+    os.replace(tmp, path)
+
+
+def load_state(path):
+    """Read a saved RunningStatistics, or None if missing or out of date"""
+    try:
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in data.files if name != 'meta'}
+    except (OSError, ValueError, KeyError):
+        return None
+    if meta.get('version') != RUNNING_VERSION:
+        return None
+    return RunningStatistics(
+        meta['header'], meta['reference'], arrays, meta['consumed'], meta['prefix'], meta['origin'], meta['rebased']
+    )
+
+
+def continues(running, path, header):
+    """SHA-1 (a hashlib object, to extend with the rows appended) of the
+    bytes running has read if the CSV at path still starts with them, else None.
+
+    Every byte read so far is hashed again, so rows rewritten in place
+    anywhere are caught; that is I/O only, nothing is parsed.
+    """
+    if running.header != header or os.path.getsize(path) < running.consumed:
+        return None
+    digest = _hash_bytes(hashlib.sha1(), path, 0, running.consumed)
+    return digest if digest.hexdigest() == running.prefix else None
+
+
+def read_rows(path, start, header):
+    """Rows of a time series CSV from byte start to its last complete line, and where they end.
+
+    A last line without its newline may still be being written, so it is
+    left for the next read.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    if end == 0:
+        return pd.DataFrame(columns=header), start
+    rows = narrow_years(pd.read_csv(io.BytesIO(data[:end]), header=None, names=header, dtype=time_series_dtypes(header)))
+    if 'dates' in rows.columns:
+        rows['dates'] = parse_dates_column(rows['dates'])
+    return rows, start + end
+
+
+def refresh(path, reference='median'):
+    """Running statistics of a time series CSV, with the rows appended since
+    the last refresh folded in and saved (in RUNNING_DIR) for the next one.
+
+    Returns (RunningStatistics, rows read). The CSV is read from scratch
+    when it is new, its header changed, any of the rows already read
+    changed, or its median reference positions are stale.
+    """
+    header = csv_columns(path)
+    state_path = _state_path(path, reference)
+    running = load_state(state_path)
+    digest = None
+    if running is not None and running.reference == reference:
+        digest = continues(running, path, header)
+    if digest is not None:
+        if os.path.getsize(path) == running.consumed:
+            return running, 0
+        rows, end = read_rows(path, running.consumed, header)
+        running.update(rows)
+        _hash_bytes(digest, path, running.consumed, end)
+        if running.stale():
+            digest = None
+
+    if digest is None:
+        with open(path, 'rb') as f:
+            start = len(f.readline())
+        rows, end = read_rows(path, start, header)
+        running = RunningStatistics(header, reference, consumed=start)
+        running.update(rows)
+        running.rebase(rows)
+        digest = _hash_bytes(hashlib.sha1(), path, 0, end)
+    running.consumed, running.prefix = end, digest.hexdigest()
+    save_state(running, state_path)
+    return running, len(rows)
+
+
+@cached_dataset
+def running_statistics(path, reference='median'):
+    """RunningStatistics of a time series CSV (cached, shared; see refresh)"""
+    running, _ = refresh(path, reference)
+    return running
+
+
+if __name__ == "__main__":
+    # Refresh the running statistics of a time series CSV, or time updates:
+    #   python running_statistics.py data/CoastSat/CATALANGA/Column1Graph/time_series_data.csv
+    #   python running_statistics.py --benchmark [--transects 2000 --scenes 2000 --new 10]
+    import argparse
+    import time
+
+    from bench import best_time
+    from timeseries import TransectSeries
+    from transect_statistics import STATISTICS_CONVENTIONS, compute_statistics
+
+    parser = argparse.ArgumentParser(description="Keep transect statistics up to date as scenes are appended")
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--method", help="use the statistics conventions of this method's exports")
+    parser.add_argument("--benchmark", action="store_true", help="time appending scenes to a synthetic series")
+    parser.add_argument("--transects", type=int, default=2000)
+    parser.add_argument("--scenes", type=int, default=2000)
+    parser.add_argument("--new", type=int, default=10, help="scenes appended per update")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        rng = np.random.default_rng(0)
+        total = args.scenes + args.new
+        dates = pd.date_range("1984-01-01", periods=total, freq="7D", tz="UTC")
+        wide = pd.DataFrame(
+            rng.normal(200, 20, (total, args.transects)).astype('float32'),
+            columns=[f"T{i}{DISTANCE_SUFFIX}" for i in range(args.transects)]
+        )
+        wide = wide.mask(rng.random(wide.shape) < 0.1)
+        wide.insert(0, 'year', dates.year.astype('int16'))
+        wide.insert(0, 'dates', dates)
+        old, new = wide.iloc[:args.scenes], wide.iloc[args.scenes:]
+
+        for reference in ('median', 'first'):
+            base = RunningStatistics(wide.columns, reference)
+            base.update(old)
+            base.rebase(old)
+
+            def append():
+                running = RunningStatistics(
+                    base.header, reference, {k: v.copy() for k, v in base.state.items()}, origin=base.origin,
+                    rebased=base.rebased
+                )
+                running.update(new)
+                return running.statistics()
+
+            running_ms = best_time(append, 5)
+            full_ms = best_time(lambda: compute_statistics(TransectSeries.from_wide(wide), reference), 3)
+            error = (append().iloc[:, 1:] - compute_statistics(TransectSeries.from_wide(wide), reference).iloc[:, 1:]).abs().max()
+            # Only the columns measured from the reference follow an earlier median
+            print(f"{reference:>6}: {args.new} new scenes on {args.transects:,} x {args.scenes:,} "
+                  f"({len(base):,} observations): update {running_ms:.1f} ms, recompute {full_ms:.0f} ms, "
+                  f"max difference {error.drop(['Mean_Change_m', 'Max_Erosion_m', 'Max_Accretion_m']).max():.2g}, "
+                  f"from the reference {error.max():.2g} m")
+    elif args.path:
+        convention = STATISTICS_CONVENTIONS.get(args.method, {})
+        start = time.perf_counter()
+        running, read = refresh(args.path, convention.get('reference', 'median'))
+        stats = running.statistics(**{key: value for key, value in convention.items() if key != 'reference'})
+        ms = (time.perf_counter() - start) * 1000
+        print(stats.to_string(index=False))
+        print(f"{read} new rows folded in ({len(running):,} observations) in {ms:.1f} ms; "
+              f"state in {_state_path(args.path, running.reference)}")
+    else:
+        parser.error("give a time series CSV, or --benchmark")
@@ -0,0 +1,143 @@
+import numpy as np
+import shapely
+
+from reproject import GEOGRAPHIC_CRS, transformer
+
+# Rough memory of one STRtree entry (envelope plus node pointers), in bytes
+TREE_BYTES_PER_FEATURE = 64
+
+
+class LayerIndex:
+    """Packed R-tree (shapely STRtree) over the features of one layer.
+
+    Built on the layer's reproject.LayerCopies: bounding box queries run on
+    the geographic (WGS84) copy, nearest queries on the projected copy so
+    distances are metres. Positions returned index the rows of either copy.
+    """
+
+    def __init__(self, copies):
+        self.copies = copies
+        self.tree = shapely.STRtree(np.asarray(copies.geographic.geometry.values, dtype=object))
+        self._projected_tree = None
+
+    def __len__(self):
+        return len(self.copies.geographic)
+
+    @property
+    def nbytes(self):
+        # The layer copies themselves are accounted to their own cache entry
+        trees = 1 if self._projected_tree is None else 2
+        return trees * len(self) * TREE_BYTES_PER_FEATURE
+
+    @property
+    def projected_tree(self):
+        """STRtree over the projected copy, built on the first nearest query"""
+        if self._projected_tree is None:
+            self._projected_tree = shapely.STRtree(
+                np.asarray(self.copies.projected.geometry.values, dtype=object)
+            )
+        return self._projected_tree
+
+    def query_bbox(self, bbox):
+        """Positions of the features whose bounding box intersects bbox (WGS84), in file order"""
+        return np.sort(self.tree.query(shapely.box(*bbox)))
+
+    def features_in(self, bbox):
+        """Features whose bounding box intersects bbox (WGS84), from the geographic copy"""
+        return self.copies.geographic.iloc[self.query_bbox(bbox)]
+
+    def nearest(self, geometries, max_distance=None):
+        """Nearest feature of each of geometries (in the projected CRS).
+
+        Returns (input positions, feature positions, distances in metres);
+        with max_distance, inputs farther than that from every feature are
+        left out. Ties return every equally near feature.
+        """
+        (inputs, features), distances = self.projected_tree.query_nearest(
+            geometries, max_distance=max_distance, return_distance=True
+        )
+        return inputs, features, distances
+
+    def nearest_point(self, lon, lat, max_distance=None):
+        """(position, distance in metres) of the feature nearest to a WGS84 point, or None"""
+        x, y = transformer(GEOGRAPHIC_CRS, self.copies.projected.crs).transform(lon, lat)
+        _, features, distances = self.nearest([shapely.Point(x, y)], max_distance)
+        if len(features) == 0:
+            return None
+        return int(features[0]), float(distances[0])
+
+
+class SiteIndex:
+    """Spatial indexes of the layers of one site: {layer name: LayerIndex}"""
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+
+    def __contains__(self, name):
+        return name in self.indexes
+
+    def __getitem__(self, name):
+        return self.indexes[name]
+
+    @property
+    def nbytes(self):
+        return sum(index.nbytes for index in self.indexes.values())
+
+    def query_bbox(self, bbox, layers=None):
+        """{layer: features whose bounding box intersects bbox (WGS84)}"""
+        return {
+            name: index.features_in(bbox)
+            for name, index in self.indexes.items()
+            if layers is None or name in layers
+        }
+
+    def nearest_transect(self, lon, lat, max_distance=None):
+        """(transect row, distance in metres) nearest to a WGS84 point, or None"""
+        if 'transects' not in self.indexes:
+            return None
+        index = self.indexes['transects']
+        found = index.nearest_point(lon, lat, max_distance)
+        if found is None:
+            return None
+        position, distance = found
+        return index.copies.geographic.iloc[position], distance
+
+
+if __name__ == "__main__":
+    # Time bounding box queries (against a full scan) and nearest-feature
+    # queries on every site's layers:
+    #   python spatial_index.py [data] [--repeat 100]
+    import argparse
+
+    from bench import best_time
+    from catalog import DATA_ROOT, load_catalog
+    from geoparquet import read_layer
+    from reproject import layer_copies
+
+    parser = argparse.ArgumentParser(description="Benchmark the spatial indexes of the map layers")
+    parser.add_argument("root", nargs="?", default=DATA_ROOT)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.root)
+    rng = np.random.default_rng(0)
+    print(f"{'layer':<60} {'features':>8} {'build':>9} {'bbox':>9} {'scan':>9} {'nearest':>9}")
+    for entry in catalog.datasets:
+        if entry['kind'] != 'shapefile' or not entry['features']:
+            continue
+        copies = layer_copies(read_layer(catalog.source(entry['path']), crs=None))
+        build = best_time(lambda: LayerIndex(copies), 5)
+        index = LayerIndex(copies)
+        # A viewport a quarter of the layer's width and height
+        minx, miny, maxx, maxy = copies.geographic.total_bounds
+        x, y = rng.uniform(minx, maxx), rng.uniform(miny, maxy)
+        bbox = (x, y, x + (maxx - minx) / 4, y + (maxy - miny) / 4)
+        box = shapely.box(*bbox)
+        geoms = np.asarray(copies.geographic.geometry.values, dtype=object)
+        times = [
+            best_time(lambda: index.query_bbox(bbox), args.repeat),
+            best_time(lambda: np.nonzero(shapely.intersects(box, shapely.envelope(geoms)))[0], args.repeat),
+            best_time(lambda: index.nearest_point(x, y), args.repeat)
+        ]
+        print(f"{entry['path']:<60} {len(index):8d} {build:6.3f} ms "
+              + " ".join(f"{ms:6.3f} ms" for ms in times))
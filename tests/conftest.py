@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The modules live at the top of the repository, next to app.py
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def data_dir():
+    """Column 1 data of every method for the CATALANGA site"""
+    return lambda method: ROOT / "data" / method / "CATALANGA" / "Column1Graph"
@@ -0,0 +1,112 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from geoparquet import read_layer
+from intersections import COMPARE_TOLERANCE, INTERSECTION_CONVENTIONS, compute_intersections, match_intersections
+
+UTM = "EPSG:32651"
+
+
+def site_layers(data_dir, method):
+    """Shorelines, transects and shipped intersections of a method's CATALANGA site"""
+    site = data_dir(method).parent
+    return tuple(
+        read_layer(site / f"CATALANGA_{layer}.shp", crs=None) for layer in ('shorelines', 'transects', 'intersections')
+    )
+
+
+@pytest.mark.parametrize('method', ['CoastSat', 'Microsoft'])
+def test_reproduces_the_shipped_intersections(method, data_dir):
+    shorelines, transects, shipped = site_layers(data_dir, method)
+    result = compute_intersections(shorelines, transects, crs=UTM, **INTERSECTION_CONVENTIONS[method])
+    merged = match_intersections(result, shipped)
+
+    # Every shipped point, on every transect, to the shipped rounding
+    assert len(merged) == len(shipped)
+    assert set(merged['transect']) == set(shipped['transect'])
+    error = (merged['distance'] - merged['distance_shipped']).abs()
+    assert error.max() <= COMPARE_TOLERANCE, error.groupby(merged['transect']).max()
+    assert (merged['year'] == merged['year_shipped']).all()
+    if method == 'Microsoft':
+        assert len(result) == len(shipped)
+
+
+def test_points_lie_at_their_distance(data_dir):
+    shorelines, transects, _ = site_layers(data_dir, 'CoastSat')
+    result = compute_intersections(shorelines, transects, 'vertices', crs=UTM)
+    lines = dict(zip(transects['name'].astype(str), transects.to_crs(UTM).geometry))
+    origins = np.array([shapely.get_coordinates(lines[name])[0] for name in result['transect']])
+    along = np.hypot(*(shapely.get_coordinates(result.to_crs(UTM).geometry) - origins).T)
+    np.testing.assert_allclose(along, np.abs(result['distance']), atol=0.01)
+
+
+def synthetic(length=100, crossings=(30, 70)):
+    """One straight west-east transect and north-south shorelines crossing
+    its line at every x of crossings"""
+    transects = gpd.GeoDataFrame({'name': ['T1']}, geometry=[shapely.LineString([(0, 0), (length, 0)])], crs=UTM)
+    shorelines = gpd.GeoDataFrame(
+        {'date': [f"{2020 + i}-01-01" for i in range(len(crossings))], 'year': [2020 + i for i in range(len(crossings))]},
+        geometry=[shapely.LineString([(x, -50), (x, 50)]) for x in crossings],
+        crs=UTM
+    )
+    shorelines['geometry'] = shapely.segmentize(shorelines.geometry.values, 5)
+    return shorelines, transects
+
+
+def test_crossings_from_either_end():
+    shorelines, transects = synthetic()
+    first = compute_intersections(shorelines, transects)
+    last = compute_intersections(shorelines, transects, origin='last')
+    np.testing.assert_allclose(first['distance'], [30, 70])
+    np.testing.assert_allclose(last['distance'], [70, 30])
+    assert shapely.equals(first.geometry.values, last.geometry.values).all()
+
+
+def test_vertices_beyond_the_transect_end():
+    shorelines, transects = synthetic(length=50)
+    result = compute_intersections(shorelines, transects, 'vertices')
+    # The corridor follows the transect's line past its end, as in CoastSat
+    np.testing.assert_allclose(result['distance'], [30, 70])
+    np.testing.assert_allclose(shapely.get_x(result.geometry.values), [30, 70])
+
+
+def test_shorelines_crossing_twice_count_at_their_seaward_vertex():
+    shorelines, transects = synthetic(crossings=(30, 40, 50))
+    # A shoreline folding back across the transect 60 m further seaward
+    fold = shapely.segmentize(shapely.LineString([(40, -50), (40, 10), (100, 10), (100, -50)]), 5)
+    shorelines.loc[1, 'geometry'] = fold
+    result = compute_intersections(shorelines, transects, 'vertices')
+    np.testing.assert_allclose(result['distance'], [30, 100, 50])
+
+    behind = compute_intersections(shorelines.iloc[[0]].assign(geometry=[shapely.segmentize(
+        shapely.LineString([(-40, -50), (-40, 0), (30, 0), (30, 50)]), 5
+    )]), transects, 'vertices', ahead_only=True)
+    assert (behind['distance'] > 0).all()
+
+
+def test_unknown_settings_are_rejected():
+    shorelines, transects = synthetic()
+    with pytest.raises(ValueError):
+        compute_intersections(shorelines, transects, origin='middle')
+    with pytest.raises(ValueError):
+        compute_intersections(shorelines, transects, method='buffer')
+
+
+def test_computed_layers_are_catalogued_for_the_map_panels(tmp_path, monkeypatch, data_dir):
+    import intersections
+    from catalog import load_catalog
+
+    monkeypatch.setattr(intersections, 'INTERSECTIONS_DIR', tmp_path / "intersections")
+    catalog = load_catalog(data_dir('Method3').parents[2], tmp_path / "catalog.json")
+    path = intersections.computed_intersections_path(catalog, 'Method3', 'CATALANGA')
+    assert path.parent == tmp_path / "intersections"
+    entry = catalog.entry_for(path)
+    assert entry['year_field'] == 'year' and 'transect' in entry['fields']
+    assert catalog.source(path) == path and catalog.file_hashes([path]) == {str(path): entry['hash']}
+    layer = read_layer(path, crs=None)
+    assert len(layer) == len(intersections.site_intersections(catalog, 'Method3', 'CATALANGA'))
+    # Derived layers stay out of the catalog listings
+    assert entry not in catalog.datasets
+    assert intersections.computed_intersections_path(catalog, 'Method3', 'NOWHERE') is None
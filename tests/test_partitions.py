@@ -0,0 +1,40 @@
+import geopandas as gpd
+import numpy as np
+import shapely
+
+import partitions
+from partitions import partition_bounds, partition_years, read_year, union_bounds, write_partitions
+
+
+def write_layer(tmp_path, years):
+    """Shapefile of one point per entry of years (NaN for no year)"""
+    gdf = gpd.GeoDataFrame(
+        {'year': np.array(years, dtype=float), 'name': [f"P{i}" for i in range(len(years))]},
+        geometry=[shapely.Point(121 + i / 100, 14) for i in range(len(years))],
+        crs="EPSG:4326"
+    )
+    path = tmp_path / "layer.shp"
+    gdf.to_file(path)
+    return path
+
+
+def test_missing_years_read_empty(tmp_path, monkeypatch):
+    monkeypatch.setattr(partitions, 'PARTITION_DIR', tmp_path / "partitions")
+    index = write_partitions(write_layer(tmp_path, [2020, 2020, 2022]), 'abc', 'year')
+    assert partition_years(index) == [2020, 2022]
+    assert len(read_year(index, 2020)) == 2
+    missing = read_year(index, 2021, ['name'])
+    assert len(missing) == 0 and list(missing.columns) == ['name', 'geometry']
+
+
+def test_layer_without_years(tmp_path, monkeypatch):
+    monkeypatch.setattr(partitions, 'PARTITION_DIR', tmp_path / "partitions")
+    index = write_partitions(write_layer(tmp_path, [np.nan, np.nan]), 'abc', 'year')
+    assert partition_years(index) == []
+    assert partition_bounds(index) is None
+    empty = read_year(index, 2020)
+    assert len(empty) == 0 and 'name' in empty.columns
+
+    # Empty bounds are skipped when other layers have some
+    assert union_bounds([partition_bounds(index), [0, 0, 1, 1], [np.nan] * 4]) == [0, 0, 1, 1]
+    assert union_bounds([None]) is None
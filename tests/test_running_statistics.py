@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+import running_statistics
+from running_statistics import REBASE_GROWTH, load_state, refresh
+from timeseries import TransectSeries, load_time_series
+from transect_statistics import compute_statistics
+
+# Columns measured from the reference position, which follow an earlier
+# median between rebases
+REFERENCE_COLUMNS = ['Mean_Change_m', 'Max_Erosion_m', 'Max_Accretion_m']
+
+
+@pytest.fixture
+def series(tmp_path, monkeypatch, data_dir):
+    """Writable copy of the CoastSat time series, cut to its first rows,
+    with the running states kept in tmp_path; returns (path, all lines)"""
+    monkeypatch.setattr(running_statistics, 'RUNNING_DIR', tmp_path / "running")
+    lines = (data_dir('CoastSat') / "time_series_data.csv").read_text().splitlines(True)
+    path = tmp_path / "time_series_data.csv"
+    path.write_text("".join(lines[:60]))
+    return path, lines
+
+
+def batch(path, reference):
+    return compute_statistics(TransectSeries.from_wide(load_time_series.__wrapped__(str(path))), reference)
+
+
+def assert_matches(running, path, reference, columns=None):
+    expected = batch(path, reference)
+    ours = running.statistics()
+    assert (ours['N_Points'] == expected['N_Points']).all()
+    columns = columns or list(expected.columns[1:])
+    # Medians are taken in float32 by compute_statistics
+    np.testing.assert_allclose(ours[columns].astype(float), expected[columns].astype(float), atol=1e-4)
+
+
+@pytest.mark.parametrize('reference', ['median', 'first'])
+def test_build_matches_batch(series, reference):
+    path, _ = series
+    running, read = refresh(str(path), reference)
+    assert read == 59
+    assert_matches(running, path, reference)
+
+
+def test_append_reads_only_new_rows(series):
+    path, lines = series
+    refresh(str(path), 'first')
+    with open(path, 'a') as f:
+        f.writelines(lines[60:65])
+    running, read = refresh(str(path), 'first')
+    assert read == 5
+    assert_matches(running, path, 'first')
+    assert refresh(str(path), 'first')[1] == 0
+
+
+def test_median_reference_is_held_until_the_series_grows(series):
+    path, lines = series
+    built, _ = refresh(str(path), 'median')
+    with open(path, 'a') as f:
+        f.writelines(lines[60:65])
+    running, read = refresh(str(path), 'median')
+    assert read == 5 and running.rebased == built.rebased
+    others = [col for col in running.statistics().columns[1:] if col not in REFERENCE_COLUMNS]
+    assert_matches(running, path, 'median', others)
+
+    with open(path, 'a') as f:
+        f.writelines(lines[65:100])
+    running, read = refresh(str(path), 'median')
+    assert len(running) > REBASE_GROWTH * built.rebased
+    assert read == 99 and running.rebased == len(running)
+    assert_matches(running, path, 'median')
+
+
+def test_rewritten_rows_are_read_again(series):
+    path, lines = series
+    refresh(str(path), 'first')
+    # Same size, the first distance of the last row read changed
+    fields = lines[59].split(',')
+    fields[2] = ('2' if fields[2][0] == '1' else '1') + fields[2][1:]
+    path.write_text("".join(lines[:59] + [','.join(fields)] + lines[60:65]))
+    running, read = refresh(str(path), 'first')
+    assert read == 64
+    assert_matches(running, path, 'first')
+
+
+@pytest.mark.parametrize('reference', ['first', 'zero'])
+def test_rows_rewritten_in_place_are_read_again(series, reference):
+    path, lines = series
+    refresh(str(path), reference)
+    # Same size, the first distance of an early row changed, more than 4 KB
+    # before the end of the rows read
+    fields = lines[3].split(',')
+    fields[2] = ('2' if fields[2][0] == '1' else '1') + fields[2][1:]
+    path.write_text("".join(lines[:3] + [','.join(fields)] + lines[4:60]))
+    assert len("".join(lines[4:60]).encode()) > 4096
+    running, read = refresh(str(path), reference)
+    assert read == 59
+    assert_matches(running, path, reference)
+
+
+def test_truncated_series_is_read_again(series):
+    path, lines = series
+    refresh(str(path), 'median')
+    path.write_text("".join(lines[:40]))
+    running, read = refresh(str(path), 'median')
+    assert read == 39
+    assert_matches(running, path, 'median')
+
+
+def test_restarts_from_the_saved_state(series):
+    path, lines = series
+    running, _ = refresh(str(path), 'median')
+    saved = load_state(running_statistics._state_path(str(path), 'median'))
+    assert saved.consumed == running.consumed and saved.rebased == running.rebased
+    assert saved.statistics().equals(running.statistics())
+
+    with open(path, 'a') as f:
+        f.writelines(lines[60:62])
+    resumed, read = refresh(str(path), 'median')
+    assert read == 2
+    others = [col for col in resumed.statistics().columns[1:] if col not in REFERENCE_COLUMNS]
+    assert_matches(resumed, path, 'median', others)
@@ -0,0 +1,48 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from reproject import GEOGRAPHIC_CRS, layer_copies, transformer
+from spatial_index import LayerIndex, SiteIndex
+
+UTM = "EPSG:32651"
+
+
+def site():
+    """Three parallel 200 m transects 100 m apart and one shoreline crossing them (UTM)"""
+    transects = gpd.GeoDataFrame(
+        {'name': ['T1', 'T2', 'T3']},
+        geometry=[shapely.LineString([(300000 + 100 * i, 1500000), (300000 + 100 * i, 1500200)]) for i in range(3)],
+        crs=UTM
+    )
+    shorelines = gpd.GeoDataFrame(
+        {'year': [2020]}, geometry=[shapely.LineString([(299950, 1500100), (300250, 1500100)])], crs=UTM
+    )
+    return SiteIndex({
+        'transects': LayerIndex(layer_copies(transects)),
+        'shorelines': LayerIndex(layer_copies(shorelines))
+    })
+
+
+def geographic(x, y):
+    return transformer(UTM, GEOGRAPHIC_CRS).transform(x, y)
+
+
+def test_nearest_transect_in_metres():
+    index = site()
+    transect, distance = index.nearest_transect(*geographic(300130, 1500050))
+    assert transect['name'] == 'T2'
+    assert distance == pytest.approx(30, abs=0.01)
+    assert index.nearest_transect(*geographic(300130, 1500050), max_distance=20) is None
+    assert SiteIndex({}).nearest_transect(*geographic(300130, 1500050)) is None
+
+
+def test_bbox_query_across_layers():
+    index = site()
+    (minx, miny), (maxx, maxy) = geographic(299980, 1499990), geographic(300120, 1500050)
+    found = index.query_bbox((minx, miny, maxx, maxy))
+    assert list(found['transects']['name']) == ['T1', 'T2']
+    assert len(found['shorelines']) == 0
+    assert list(index.query_bbox((minx, miny, maxx, maxy), layers=['shorelines'])) == ['shorelines']
+    np.testing.assert_array_equal(index['transects'].query_bbox((minx, miny, maxx, maxy)), [0, 1])
@@ -0,0 +1,33 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from timeseries import TransectSeries, narrow_years, parse_dates_column
+
+# Blank year on the second row, blank date on the third
+CSV = """dates,year,A_distance_m,B_distance_m
+2020-01-01,2020,10,20
+2021-01-01,,11,21
+,2022,12,
+2023-01-01,2023,13,23
+"""
+
+
+def series():
+    df = narrow_years(pd.read_csv(io.StringIO(CSV), dtype={'year': 'Float64'}))
+    df['dates'] = parse_dates_column(df['dates'])
+    return TransectSeries.from_wide(df)
+
+
+def test_frame_drops_observations_without_a_date_or_year():
+    frame = series().frame('A')
+    assert list(frame['A_distance_m']) == [10, 13]
+    assert not frame[['dates', 'year']].isna().any(axis=None)
+
+
+def test_frame_keeps_the_rows_with_the_required_columns():
+    ts = series()
+    np.testing.assert_array_equal(ts.frame('A', required=['year'])['A_distance_m'], [10, 12, 13])
+    np.testing.assert_array_equal(ts.frame('B', required=['year'])['B_distance_m'], [20, 23])
+    assert len(ts.frame('A', required=())) == 4
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from transect_statistics import STATISTICS_CONVENTIONS, compute_statistics, load_statistics
+from timeseries import TransectSeries, load_transect_series
+
+# Transects whose exported N_Points count an observation their time series
+# does not have
+N_POINTS_MISMATCHES = {'Method3': {'NA16', 'NA17'}}
+
+
+@pytest.mark.parametrize('method', sorted(STATISTICS_CONVENTIONS))
+def test_reproduces_the_shipped_statistics(method, data_dir):
+    path = data_dir(method)
+    ours = compute_statistics(load_transect_series(str(path / "time_series_data.csv")), **STATISTICS_CONVENTIONS[method])
+    shipped = load_statistics(str(path / "transect_statistics.csv"))
+    ours = ours.set_index(ours['Transect'].astype(str)).loc[shipped['Transect'].astype(str)]
+    shipped = shipped.set_index(shipped['Transect'].astype(str))
+
+    for col in shipped.columns[1:]:
+        if col == 'N_Points':
+            expected = shipped[col].drop(list(N_POINTS_MISMATCHES.get(method, ())))
+            assert (ours[col].loc[expected.index] == expected).all()
+        else:
+            # The exports are rounded to 2 decimals
+            np.testing.assert_allclose(ours[col].astype(float), shipped[col].astype(float), atol=0.006, err_msg=col)
+
+
+def test_transects_without_observations_are_nan():
+    wide = pd.DataFrame({
+        'dates': pd.to_datetime(['2020-01-01', '2021-01-01'], utc=True),
+        'year': np.array([2020, 2021], dtype='int16'),
+        'A_distance_m': np.array([10, 12], dtype='float32'),
+        'B_distance_m': np.array([np.nan, np.nan], dtype='float32')
+    })
+    stats = compute_statistics(TransectSeries.from_wide(wide)).set_index('Transect')
+    assert stats.loc['A', 'N_Points'] == 2
+    assert stats.loc['A', 'Net_Change_m'] == pytest.approx(2)
+    assert stats.loc['B', 'N_Points'] == 0
+    assert stats.loc['B', ['Mean_Change_m', 'Rate_m_per_year']].isna().all()
+
+
+def test_unknown_conventions_are_rejected():
+    series = TransectSeries.from_wide(pd.DataFrame({
+        'year': np.array([2020], dtype='int16'),
+        'A_distance_m': np.array([10], dtype='float32')
+    }))
+    with pytest.raises(ValueError):
+        compute_statistics(series, reference='mean')
+    with pytest.raises(ValueError):
+        compute_statistics(series, net='mean')
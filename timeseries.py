@@ -0,0 +1,277 @@
+import csv
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_sources import source_signature, temporary_path
+from dataset_cache import cached_dataset
+
+# Columns of the per-transect time series holding shoreline distances
+DISTANCE_SUFFIX = '_distance_m'
+
+# Persist parsed tables as 'parquet' or 'feather' (unset = off), in TABLE_DIR
+TABLE_CACHE_FORMAT = os.environ.get("TABLE_CACHE_FORMAT", "")
+TABLE_DIR = Path(".cache/tables")
+
+# Where transect series live: 'memory' (pandas, per process) or 'mmap'
+# (NumPy files in SERIES_DIR, shared by every process through the page cache)
+TIMESERIES_BACKEND = os.environ.get("TIMESERIES_BACKEND", "memory")
+SERIES_DIR = Path(".cache/series")
+
+# dtypes of the transect statistics; the other columns are read as float64
+STATISTICS_DTYPES = {'Transect': 'category', 'N_Points': 'int16'}
+
+
+def csv_columns(path):
+    """Header of a CSV file (read without starting a pandas parser)"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+
+def time_series_dtypes(columns):
+    """dtypes of a time series: nullable Int16 years and float32 distances"""
+    dtypes = {col: 'float32' for col in columns if col.endswith(DISTANCE_SUFFIX)}
+    if 'year' in columns:
+        # Nullable, so rows with a blank year still parse
+        dtypes['year'] = 'Int16'
+    return dtypes
+
+
+def narrow_years(df):
+    """Turn a year column without blanks into plain int16, in place; returns df"""
+    if 'year' in df.columns and not df['year'].hasnans:
+        df['year'] = df['year'].astype('int16')
+    return df
+
+
+def parse_dates_column(dates):
+    """Parse a dates column, trying the ISO 8601 exports' fixed format first"""
+    try:
+        return pd.to_datetime(dates, format='ISO8601')
+    except ValueError:
+        return pd.to_datetime(dates)
+
+
+def _table_path(path, variant=''):
+    """Persisted copy of a parsed CSV, named after the CSV's absolute path"""
+    digest = hashlib.sha1(os.path.realpath(path).encode()).hexdigest()[:16]
+    return TABLE_DIR / f"{Path(path).stem}-{digest}{variant}.{TABLE_CACHE_FORMAT}"
+
+
+def _read_table(path, parse, variant=''):
+    """Read a parsed table from its persisted copy when fresh, else parse the CSV"""
+    if TABLE_CACHE_FORMAT not in ('parquet', 'feather'):
+        return parse()
+
+    table = _table_path(path, variant)
+    if table.exists() and os.stat(table).st_mtime_ns >= os.stat(path).st_mtime_ns:
+        return pd.read_parquet(table) if TABLE_CACHE_FORMAT == 'parquet' else pd.read_feather(table)
+
+    df = parse()
+    TABLE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = temporary_path(table)
+    if TABLE_CACHE_FORMAT == 'parquet':
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_feather(tmp)
+    os.replace(tmp, table)
+    return df
+
+
+class TransectSeries:
+    """Shoreline distances of every transect in long format.
+
+    One row per observation (dates, year, distance), sorted by transect:
+    rows offsets[i]:offsets[i + 1] hold the series of transects[i] in file
+    order, so reading one transect is a slice instead of a scan of the wide
+    table's rows. Scenes that miss a transect take no space.
+    """
+
+    def __init__(self, transects, offsets, columns, timezones=None):
+        self.transects = list(transects)
+        self.offsets = offsets
+        self.columns = columns
+        # Time zones of date columns stored as naive UTC datetime64 (memory-mapped)
+        self.timezones = timezones or {}
+        self._positions = {name: i for i, name in enumerate(self.transects)}
+
+    @classmethod
+    def from_wide(cls, df):
+        """Build from a wide time series (one <transect>_distance_m column per transect)"""
+        distance_columns = [col for col in df.columns if col.endswith(DISTANCE_SUFFIX)]
+        values = df[distance_columns].to_numpy(dtype='float32').T
+        present = ~np.isnan(values)
+        # Row-major nonzero walks transect by transect, in file order within each
+        transect_index, row_index = np.nonzero(present)
+        columns = {
+            col: df[col].array[row_index]
+            for col in df.columns if col not in distance_columns
+        }
+        columns['distance'] = values[transect_index, row_index]
+        offsets = np.concatenate([[0], np.cumsum(present.sum(axis=1))])
+        return cls([col[:-len(DISTANCE_SUFFIX)] for col in distance_columns], offsets, columns)
+
+    @classmethod
+    def from_long(cls, df):
+        """Build from to_long() output (rows grouped by the categorical transect)"""
+        codes = df['transect'].cat.codes.to_numpy()
+        if len(codes) and (np.diff(codes) < 0).any():
+            df = df.iloc[np.argsort(codes, kind='stable')]
+            codes = df['transect'].cat.codes.to_numpy()
+        categories = df['transect'].cat.categories
+        counts = np.bincount(codes, minlength=len(categories))
+        columns = {col: df[col].array for col in df.columns if col != 'transect'}
+        return cls(categories, np.concatenate([[0], np.cumsum(counts)]), columns)
+
+    def to_long(self):
+        """The observations as a DataFrame with a categorical transect column"""
+        codes = np.repeat(np.arange(len(self.transects)), np.diff(self.offsets))
+        return pd.DataFrame({
+            'transect': pd.Categorical.from_codes(codes, categories=self.transects),
+            **{col: self._values(col, slice(None)) for col in self.columns}
+        })
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def nbytes(self):
+        """Memory held by this process (memory-mapped columns are shared pages)"""
+        arrays = [self.offsets, *self.columns.values()]
+        return sum(array.nbytes for array in arrays if not isinstance(array, np.memmap))
+
+    def _values(self, col, rows):
+        values = self.columns[col][rows]
+        if col in self.timezones:
+            return pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(self.timezones[col])
+        return values
+
+    def frame(self, transect, required=('dates', 'year')):
+        """Observations of one transect: dates, year and <transect>_distance_m columns.
+
+        Rows missing any of the required columns (that the series has) are
+        dropped, as the panels cannot place them on their time axis.
+        """
+        i = self._positions[transect]
+        rows = slice(self.offsets[i], self.offsets[i + 1])
+        frame = {col: self._values(col, rows) for col in self.columns if col != 'distance'}
+        frame[f"{transect}{DISTANCE_SUFFIX}"] = self.columns['distance'][rows]
+        frame = pd.DataFrame(frame)
+        required = [col for col in required if col in frame.columns]
+        if len(frame) and frame[required].isna().any(axis=None):
+            frame = frame.dropna(subset=required).reset_index(drop=True)
+        return frame
+
+
+@cached_dataset
+def load_time_series(path, parse_dates=True):
+    """Load a transect time series (dates, year, <transect>_distance_m columns).
+
+    Parsed once with explicit dtypes and kept in the shared dataset cache;
+    the dates (tz-aware where the CSV has offsets) are converted here when
+    parse_dates is set. The result is shared, so callers must not modify it.
+    """
+    def parse():
+        # utf-8-sig drops the byte order mark some exports start with
+        df = narrow_years(pd.read_csv(path, dtype=time_series_dtypes(csv_columns(path)), encoding='utf-8-sig'))
+        if parse_dates and 'dates' in df.columns:
+            df['dates'] = parse_dates_column(df['dates'])
+        return df
+
+    return _read_table(path, parse, '.dates' if parse_dates else '')
+
+
+@cached_dataset
+def load_statistics(path):
+    """Load per-transect statistics with a categorical Transect column (cached, shared)"""
+    def parse():
+        columns = csv_columns(path)
+        dtypes = {col: dtype for col, dtype in STATISTICS_DTYPES.items() if col in columns}
+        return pd.read_csv(path, dtype=dtypes, encoding='utf-8-sig')
+
+    return _read_table(path, parse)
+
+
+def _series_dir(path):
+    digest = hashlib.sha1(os.path.realpath(path).encode()).hexdigest()[:16]
+    return SERIES_DIR / f"{Path(path).stem}-{digest}"
+
+
+def _save_atomic(path, array):
+    # np.save adds .npy to names without it
+    tmp = temporary_path(path, '.tmp.npy')
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def write_series_store(series, directory, signature=None):
+    """Write a TransectSeries as one .npy file per column plus a JSON index.
+
+    Date columns are stored as naive UTC datetime64 with their time zone in
+    the index. index.json is written last, so a directory with an index
+    is complete.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    timezones = {}
+    for col, values in series.columns.items():
+        tz = getattr(values, 'tz', None)
+        if tz is not None:
+            timezones[col] = str(tz)
+            values = values.tz_convert('UTC').tz_localize(None)
+        elif isinstance(values.dtype, pd.Int16Dtype) and pd.isna(values).any():
+            # Years with blanks: NaN in a float array, as .npy has no missing values
+            values = values.to_numpy(dtype='float64', na_value=np.nan)
+        _save_atomic(directory / f"{col}.npy", np.asarray(values))
+    _save_atomic(directory / "offsets.npy", np.asarray(series.offsets, dtype='int64'))
+
+    index = {
+        'transects': series.transects,
+        'columns': list(series.columns),
+        'timezones': timezones,
+        'signature': signature
+    }
+    tmp = temporary_path(directory / "index.json")
+    tmp.write_text(json.dumps(index), encoding='utf-8')
+    os.replace(tmp, directory / "index.json")
+
+
+def open_series_store(directory, signature=None):
+    """Open a series store read-only and memory-mapped; None if missing or out of date"""
+    try:
+        index = json.loads((directory / "index.json").read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if signature is not None and index['signature'] != signature:
+        return None
+    return TransectSeries(
+        index['transects'],
+        np.load(directory / "offsets.npy", mmap_mode='r'),
+        {col: np.load(directory / f"{col}.npy", mmap_mode='r') for col in index['columns']},
+        index['timezones']
+    )
+
+
+@cached_dataset
+def load_transect_series(path):
+    """Load a wide time series CSV as a TransectSeries (cached, shared).
+
+    With TIMESERIES_BACKEND=mmap the series is written once to SERIES_DIR
+    and every process maps the same files instead of holding its own copy.
+    """
+    if TIMESERIES_BACKEND == 'mmap':
+        directory = _series_dir(path)
+        signature = [list(item) for item in source_signature(path)]
+        series = open_series_store(directory, signature)
+        if series is None:
+            write_series_store(TransectSeries.from_wide(load_time_series(path)), directory, signature)
+            series = open_series_store(directory, signature)
+        return series
+
+    def parse():
+        return TransectSeries.from_wide(load_time_series(path)).to_long()
+
+    return TransectSeries.from_long(_read_table(path, parse, '.long'))
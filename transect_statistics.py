@@ -0,0 +1,279 @@
+import numpy as np
+import pandas as pd
+
+from dataset_cache import cached_dataset
+from timeseries import STATISTICS_DTYPES, TransectSeries, load_statistics, load_transect_series, parse_dates_column
+
+# Days per year used for the rates (m/year)
+DAYS_PER_YEAR = 365.25
+
+# How each method's exported transect_statistics.csv measures change, as
+# checked against its export (see compute_statistics): CoastSat (shipped
+# again as Coastsat and Method4) from the median position; Microsoft from
+# the first observation, with distances measured landward (sign -1);
+# Method 3 on the raw distances, with the sample standard deviation, net
+# change as min - max and 0 for what one observation leaves undefined.
+# Methods missing here keep their shipped export even when it is stale
+STATISTICS_CONVENTIONS = {
+    'CoastSat': {},
+    'Coastsat': {},
+    'Method4': {},
+    'Microsoft': {'reference': 'first', 'sign': -1},
+    'Method3': {'reference': 'zero', 'ddof': 1, 'net': 'range', 'undefined': 0.0}
+}
+
+# Reference positions change is measured from, and kinds of net change
+REFERENCES = ('median', 'first', 'zero')
+NET_CHANGES = ('endpoints', 'range')
+
+# Columns of transect_statistics.csv, then the DSAS rates added here
+STATISTICS_COLUMNS = [
+    'Transect', 'Mean_Change_m', 'Std_Dev_m', 'Max_Erosion_m', 'Max_Accretion_m',
+    'Net_Change_m', 'Rate_m_per_year', 'N_Points',
+    'EPR_m_per_year', 'LRR_m_per_year', 'LR2', 'WLR_m_per_year', 'SCE_m'
+]
+
+
+def observation_years(series):
+    """Time of every observation of a TransectSeries, in years since the first one"""
+    if 'dates' not in series.columns:
+        return np.asarray(series.columns['year'], dtype='float64')
+    dates = pd.DatetimeIndex(series.columns['dates'])
+    return np.asarray((dates - dates.min()) / pd.Timedelta(days=DAYS_PER_YEAR), dtype='float64')
+
+
+def _group_order(values, groups):
+    """Order sorting values within each group (groups ascending and contiguous).
+
+    One argsort of group + value scaled to [0, 0.5] instead of np.lexsort,
+    which is an order of magnitude slower on millions of observations.
+    """
+    if len(values) == 0:
+        return np.arange(0)
+    low, span = values.min(), values.max() - values.min()
+    return np.argsort(groups + (values - low) / (2 * span if span > 0 else 1))
+
+
+def group_median(values, groups, starts, n):
+    """Median of values in every group (groups ascending and contiguous, starting at starts, n long)"""
+    ranked = values[_group_order(values, groups)]
+    return (ranked[starts + (n - 1) // 2] + ranked[starts + n // 2]) / 2
+
+
+def _slope(t, y, starts, n, weights=None):
+    """Least squares slope (and R^2) of y against t in every group, weighted if given"""
+    if weights is None:
+        weights = np.ones_like(t)
+    total = np.add.reduceat(weights, starts)
+    dt = t - np.repeat(np.add.reduceat(weights * t, starts) / total, n)
+    dy = y - np.repeat(np.add.reduceat(weights * y, starts) / total, n)
+    sxx = np.add.reduceat(weights * dt * dt, starts)
+    sxy = np.add.reduceat(weights * dt * dy, starts)
+    syy = np.add.reduceat(weights * dy * dy, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(sxx > 0, sxy / sxx, np.nan), np.where(sxx * syy > 0, sxy * sxy / (sxx * syy), np.nan)
+
+
+def compute_statistics(series, reference='median', sign=1, uncertainty=None, ddof=0, net='endpoints',
+                       undefined=None):
+    """Change statistics of every transect of a TransectSeries at once.
+
+    Every statistic is a NumPy group reduction over the series' transect
+    slices (np.add/minimum/maximum.reduceat on its offsets) instead of a
+    Python loop per transect. Change is measured as
+    sign * (distance - reference position), the reference being the
+    transect's median position, its first observation or zero. The
+    standard deviation divides by n - ddof; net change is
+    sign * (last - first distance), or sign * (min - max) with
+    net='range'. Statistics too few observations leave undefined are NaN,
+    or undefined when given.
+
+    Returns the transect_statistics.csv columns (Rate_m_per_year is the
+    end point rate) plus the DSAS rates: EPR (end point rate), LRR and LR2
+    (least squares rate and its R^2), WLR (least squares weighted by
+    1 / uncertainty^2, where uncertainty is one value or one per
+    observation, in metres; the LRR without it) and SCE (the envelope of
+    all positions). Transects without observations get N_Points 0 and NaN.
+    """
+    counts = np.diff(np.asarray(series.offsets))
+    present = counts > 0
+    n = counts[present]
+    starts = np.cumsum(n) - n
+    groups = np.repeat(np.arange(len(n)), n)
+
+    # Observations in time order within each transect (the usual case already)
+    t = observation_years(series)
+    distance = np.asarray(series.columns['distance'], dtype='float64')
+    order = None
+    if not np.all((np.diff(t) >= 0) | (np.diff(groups) != 0)):
+        order = _group_order(t, groups)
+        t, distance = t[order], distance[order]
+    first, last = starts, starts + n - 1
+
+    if reference not in REFERENCES:
+        raise ValueError(f"Unknown reference position: {reference!r}")
+    if net not in NET_CHANGES:
+        raise ValueError(f"Unknown net change: {net!r}")
+    if reference == 'median':
+        position = group_median(distance, groups, starts, n)
+    elif reference == 'first':
+        position = distance[first]
+    else:
+        position = np.zeros(len(n))
+
+    change = sign * (distance - np.repeat(position, n))
+    mean = np.add.reduceat(change, starts) / n
+    deviation = change - np.repeat(mean, n)
+    span = t[last] - t[first]
+    lowest, highest = np.minimum.reduceat(distance, starts), np.maximum.reduceat(distance, starts)
+    if net == 'range':
+        net = sign * (lowest - highest)
+    else:
+        net = sign * (distance[last] - distance[first])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        epr = np.where(span > 0, net / span, np.nan)
+        std = np.where(n > ddof, np.sqrt(np.add.reduceat(deviation * deviation, starts) / (n - ddof)), np.nan)
+
+    lrr, lr2 = _slope(t, sign * distance, starts, n)
+    if uncertainty is None:
+        wlr = lrr
+    else:
+        uncertainty = np.broadcast_to(np.asarray(uncertainty, dtype='float64'), distance.shape)
+        weights = 1 / (uncertainty if order is None else uncertainty[order]) ** 2
+        wlr, _ = _slope(t, sign * distance, starts, n, weights)
+
+    values = {
+        'Mean_Change_m': mean,
+        'Std_Dev_m': std,
+        'Max_Erosion_m': np.minimum.reduceat(change, starts),
+        'Max_Accretion_m': np.maximum.reduceat(change, starts),
+        'Net_Change_m': net,
+        'Rate_m_per_year': epr,
+        'EPR_m_per_year': epr,
+        'LRR_m_per_year': lrr,
+        'LR2': lr2,
+        'WLR_m_per_year': wlr,
+        'SCE_m': highest - lowest
+    }
+
+    return statistics_frame(series.transects, counts, values, undefined)
+
+
+def statistics_frame(transects, counts, values, undefined=None):
+    """STATISTICS_COLUMNS table of every transect from {column: values of the
+    transects with observations}; the others get NaN. NaN values of those
+    transects become undefined when given."""
+    present = counts > 0
+    if undefined is not None:
+        values = {col: np.where(np.isnan(value), undefined, value) for col, value in values.items()}
+    stats = pd.DataFrame({'Transect': pd.Categorical(transects)})
+    for col in STATISTICS_COLUMNS[1:]:
+        if col == 'N_Points':
+            stats[col] = counts.astype(STATISTICS_DTYPES['N_Points'])
+        else:
+            stats[col] = np.full(len(counts), np.nan)
+            stats.loc[present, col] = values[col]
+    return stats
+
+
+def series_from_intersections(gdf, transect_field='transect', date_field='date', distance_field='distance'):
+    """TransectSeries of an intersections layer (one point per transect and shoreline)"""
+    df = pd.DataFrame({
+        'transect': pd.Categorical(gdf[transect_field]),
+        'dates': parse_dates_column(gdf[date_field]),
+        'distance': gdf[distance_field].to_numpy(dtype='float32')
+    })
+    return TransectSeries.from_long(df.sort_values(['transect', 'dates'], kind='stable'))
+
+
+@cached_dataset
+def derive_statistics(path, reference='median', sign=1, ddof=0, net='endpoints', undefined=None):
+    """Statistics derived from a time series CSV or an intersections layer (cached, shared)"""
+    if str(path).lower().endswith('.csv'):
+        series = load_transect_series(path)
+    else:
+        from geoparquet import read_layer
+
+        series = series_from_intersections(read_layer(path, crs=None, columns=('transect', 'date', 'distance')))
+    return compute_statistics(series, reference, sign, ddof=ddof, net=net, undefined=undefined)
+
+
+def site_statistics(catalog, method, site):
+    """Transect statistics of a method's site.
+
+    Read from its transect_statistics.csv while that counts every
+    observation of its time_series_data.csv; once scenes are appended to
+    the time series, or without the CSV, they come from the running
+    statistics of the time series (see running_statistics.py), updated
+    with only the new rows. Without a time series they are derived from
+    its intersections layer, or from the intersections of its shorelines
+    with its transects (see intersections.py); None if the site has none
+    of them. Derived statistics follow the method's STATISTICS_CONVENTIONS;
+    a method missing there keeps its export, so one panel never mixes
+    conventions.
+    """
+    from intersections import site_intersections
+    from running_statistics import running_statistics
+
+    path = catalog.find(method, site, 'transect_statistics')
+    stats = load_statistics(str(catalog.source(path))) if path is not None else None
+    if stats is not None and method not in STATISTICS_CONVENTIONS:
+        return stats
+
+    convention = STATISTICS_CONVENTIONS.get(method, {})
+    series_path = catalog.find(method, site, 'time_series_data')
+    if series_path is not None:
+        # The time series itself, not its store copy: appended rows keep its path
+        running = running_statistics(str(series_path), convention.get('reference', 'median'))
+        if stats is None or not running.covered_by(stats):
+            return running.statistics(**{key: value for key, value in convention.items() if key != 'reference'})
+    if stats is not None:
+        return stats
+    path = catalog.find(method, site, 'intersections')
+    if path is not None:
+        return derive_statistics(str(catalog.source(path)), **convention)
+    intersections = site_intersections(catalog, method, site)
+    if intersections is None or len(intersections) == 0:
+        return None
+    return compute_statistics(series_from_intersections(intersections), **convention)
+
+
+if __name__ == "__main__":
+    # Derive transect statistics from a time series CSV or intersections layer:
+    #   python transect_statistics.py data/CoastSat/CATALANGA/Column1Graph/time_series_data.csv
+    #   python transect_statistics.py <path> --method Microsoft -o statistics.csv
+    #   python transect_statistics.py --benchmark [--transects 2000 --scenes 2000]
+    import argparse
+
+    from bench import best_time
+
+    parser = argparse.ArgumentParser(description="Derive DSAS-style transect statistics")
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--method", help="use the statistics conventions of this method's exports")
+    parser.add_argument("-o", "--output", help="write the statistics to this CSV")
+    parser.add_argument("--benchmark", action="store_true", help="time a synthetic transects x scenes series")
+    parser.add_argument("--transects", type=int, default=2000)
+    parser.add_argument("--scenes", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        rng = np.random.default_rng(0)
+        dates = pd.date_range("1984-01-01", periods=args.scenes, freq="7D", tz="UTC")
+        wide = pd.DataFrame(
+            rng.normal(200, 20, (args.scenes, args.transects)).astype('float32'),
+            columns=[f"T{i}_distance_m" for i in range(args.transects)]
+        )
+        # A tenth of the scenes miss each transect (clouds, no data)
+        wide = wide.mask(rng.random(wide.shape) < 0.1)
+        wide.insert(0, 'year', dates.year.astype('int16'))
+        wide.insert(0, 'dates', dates)
+        series = TransectSeries.from_wide(wide)
+        ms = best_time(lambda: compute_statistics(series), 5)
+        print(f"{args.transects:,} transects x {args.scenes:,} scenes ({len(series):,} observations): {ms:.0f} ms")
+    elif args.path:
+        stats = derive_statistics.__wrapped__(args.path, **STATISTICS_CONVENTIONS.get(args.method, {}))
+        if args.output:
+            stats.to_csv(args.output, index=False)
+        print(stats.to_string(index=False))
+    else:
+        parser.error("give a time series CSV or intersections layer, or --benchmark")
@@ -0,0 +1,203 @@
+import folium
+import numpy as np
+import shapely
+import streamlit as st
+from geopandas import GeoSeries
+from streamlit_folium import st_folium
+
+from catalog import get_catalog
+from dataset_cache import cached_dataset, dataset_nbytes
+from map_lod import LOD_TOLERANCES, simplify_pyramid, tolerance_for_view
+from map_panel import (
+    LAYER_NAMES,
+    LOD_LAYERS,
+    MAP_ZOOM,
+    YEAR_LAYERS,
+    layer_columns,
+    load_layer_copies,
+    load_site_index,
+    map_precision,
+    year_slider
+)
+from partitions import load_partition_index, partition_bounds, partition_years, union_bounds
+from spatial_index import LayerIndex
+
+# Share of the view's width and height added on each side, so short pans
+# still find their features drawn
+VIEWPORT_MARGIN = 0.25
+
+# Radius of the intersection markers, in pixels
+MARKER_RADIUS = 4
+
+# Leaflet zoom levels count 256 px tiles (Mapbox's count 512 px ones)
+LEAFLET_TILE_SIZE = 256
+
+# Farthest a clicked point may be from a transect for it to be reported (m)
+NEAREST_TRANSECT_DISTANCE = 500
+
+
+class ViewportLayer:
+    """A layer as the Leaflet renderer draws it: its STRtree index and its
+    detail levels ({tolerance: WGS84 features}; only full detail unless
+    levels), in one cache entry so a pan looks up one dataset per layer"""
+
+    def __init__(self, copies, levels=False):
+        self.index = LayerIndex(copies)
+        self.pyramid = simplify_pyramid(copies) if levels else {0: copies.geographic}
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def nbytes(self):
+        # The full detail level is the geographic copy
+        frames = [self.index.copies.projected, *self.pyramid.values()]
+        return self.index.nbytes + sum(dataset_nbytes(gdf) for gdf in frames)
+
+
+@cached_dataset
+def load_viewport_layer(path, columns=None, partition=None, levels=False):
+    """ViewportLayer of a layer (see map_panel.load_layer_copies for partition)"""
+    return ViewportLayer(load_layer_copies.__wrapped__(path, columns, partition), levels)
+
+
+def viewport_state(key):
+    """(bbox, zoom) the map under key last reported, or (None, None) before the first report"""
+    view = st.session_state.get(key) or {}
+    bounds = view.get('bounds') or {}
+    south_west, north_east = bounds.get('_southWest') or {}, bounds.get('_northEast') or {}
+    bbox = (south_west.get('lng'), south_west.get('lat'), north_east.get('lng'), north_east.get('lat'))
+    if None in bbox:
+        return None, None
+    return bbox, view.get('zoom')
+
+
+def padded(bbox, margin=VIEWPORT_MARGIN):
+    """bbox grown by margin times its width and height on each side"""
+    minx, miny, maxx, maxy = bbox
+    dx, dy = (maxx - minx) * margin, (maxy - miny) * margin
+    return minx - dx, miny - dy, maxx + dx, maxy + dy
+
+
+def rounded(gdf, precision):
+    """gdf with its coordinates rounded to precision decimals (None = as is)"""
+    if precision is None:
+        return gdf
+    geoms = shapely.transform(np.asarray(gdf.geometry.values, dtype=object), lambda xy: np.round(xy, precision))
+    return gdf.set_geometry(GeoSeries(geoms, index=gdf.index, crs=gdf.crs, name=gdf.geometry.name))
+
+
+def layer_geojson(name, gdf, style):
+    """Leaflet layer of the features of one map layer, with hover tooltips"""
+    color = style['colors'][name]
+    fields = [col for col in gdf.columns if col != gdf.geometry.name]
+    tooltip = folium.GeoJsonTooltip(fields=fields) if fields else None
+    title = LAYER_NAMES[name] + style.get('legend_suffix', '')
+    if name == 'intersections':
+        return folium.GeoJson(
+            gdf, name=title, tooltip=tooltip,
+            marker=folium.CircleMarker(radius=MARKER_RADIUS, color=color, fill=True, fill_color=color, fill_opacity=0.9)
+        )
+    # Change polygons are drawn as outlines, like on the animated map
+    width = style.get('width', 2)
+    return folium.GeoJson(
+        gdf, name=title, tooltip=tooltip,
+        style_function=lambda feature: {'color': color, 'weight': width, 'fill': False}
+    )
+
+
+def render_viewport_map(method, site, paths, names, year_fields, style):
+    """Draw a map panel with Leaflet, sending only the features in view.
+
+    The extent and zoom the browser reports after each pan or zoom are kept
+    in the session (under the st_folium key); on the rerun they trigger,
+    the layers' spatial indexes pick the features inside the padded
+    extent, at the detail level matching the zoom. The per-year layers
+    show one year, read from their year partitions. A click reports the
+    nearest transect.
+    """
+    catalog = get_catalog()
+    sources = {name: str(catalog.source(paths[name])) for name in names}
+    indexes = {
+        name: load_partition_index(sources[name], catalog.entry_for(paths[name])['hash'], field)
+        for name, field in year_fields.items()
+    }
+    years = sorted(set().union(*(partition_years(index) for index in indexes.values())))
+
+    if year_fields and len(years) == 0:
+        st.warning("⚠️ No valid years found in the data.")
+        return
+
+    year = year_slider(years, method, site) if years else None
+    partitions = {
+        name: (index['hash'], index['year_field'], year)
+        for name, index in indexes.items()
+    }
+    spatial = {
+        name: load_viewport_layer(sources[name], layer_columns(name), partitions.get(name), name in LOD_LAYERS)
+        for name in names
+    }
+
+    # Until the browser reports its view, assume every feature is in it
+    extent = union_bounds([partition_bounds(index) for index in indexes.values()] + [
+        spatial[name].pyramid[0].total_bounds for name in names if name not in indexes
+    ])
+    if extent is None:
+        st.warning("⚠️ No features found in the data.")
+        return
+    map_key = f"viewport_map_{method}_{site}"
+    bbox, zoom = viewport_state(map_key)
+    bbox, zoom = bbox or extent, zoom or MAP_ZOOM
+    tolerance = 0
+    if st.session_state.get('map_detail', 'Auto') != 'Full resolution':
+        tolerance = tolerance_for_view(zoom, (bbox[1] + bbox[3]) / 2, LOD_TOLERANCES, LEAFLET_TILE_SIZE)
+
+    precision = map_precision()
+    features = folium.FeatureGroup(name="Features")
+    drawn = {}
+    for name in ('transects',) + YEAR_LAYERS:
+        if name not in spatial:
+            continue
+        positions = spatial[name].index.query_bbox(padded(bbox))
+        gdf = spatial[name].pyramid[tolerance if name in LOD_LAYERS else 0]
+        drawn[name] = gdf.iloc[positions]
+        if len(positions):
+            layer_geojson(name, rounded(drawn[name], precision), style).add_to(features)
+
+    # The map itself never changes, so Leaflet keeps the user's view and only
+    # the feature group is replaced on reruns
+    center = [(extent[1] + extent[3]) / 2, (extent[0] + extent[2]) / 2]
+    view = st_folium(
+        folium.Map(location=center, zoom_start=MAP_ZOOM, tiles="OpenStreetMap"),
+        key=map_key,
+        feature_group_to_add=features,
+        returned_objects=['bounds', 'zoom', 'last_clicked'],
+        use_container_width=True,
+        height=600
+    )
+
+    # A click on the map reports the transect nearest to it, from the site's
+    # projected index (distances in metres)
+    clicked = (view or {}).get('last_clicked')
+    if clicked and paths.get('transects') is not None:
+        found = load_site_index(paths).nearest_transect(clicked['lng'], clicked['lat'], NEAREST_TRANSECT_DISTANCE)
+        if found is None:
+            st.caption(f"📍 No transect within {NEAREST_TRANSECT_DISTANCE:,} m of the point clicked")
+        else:
+            transect, distance = found
+            st.caption(f"📍 Nearest transect: {transect.get('name', transect.name)} ({distance:,.0f} m from the point clicked)")
+
+    legend_suffix = style.get('legend_suffix', '')
+    st.markdown(" &nbsp; ".join(
+        f"<span style='color: {style['colors'][name]}'>■</span> {LAYER_NAMES[name]}{legend_suffix}"
+        for name in drawn
+    ), unsafe_allow_html=True)
+
+    if st.session_state.get('show_map_payload'):
+        sent = sum(len(gdf) for gdf in drawn.values())
+        total = sum(len(spatial[name]) for name in drawn)
+        size = sum(len(rounded(gdf, precision).to_json()) for gdf in drawn.values() if len(gdf))
+        st.caption(
+            f"Viewport: {sent:,} of {total:,} features sent ({size / 1024:,.0f} KB GeoJSON)"
+            + (f" · {year}" if year is not None else "") + f" · {tolerance} m detail"
+        )